@@ -3,143 +3,368 @@ Synthetic Data Generator for Retail Customer Churn Project
 Generates realistic customer, transaction, and subscription data with churn patterns.
 """
 
+import argparse
+import multiprocessing
+import os
+import pickle
+from pathlib import Path
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from joblib import Parallel, delayed, effective_n_jobs
+from joblib.externals.loky import get_reusable_executor
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import faker
 from faker import Faker
-from datetime import datetime, timedelta
-import uuid
-import random
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 fake = Faker()
 Faker.seed(42)
-np.random.seed(42)
-random.seed(42)
+SEED = 42
+RNG = np.random.default_rng(SEED)
 
 NUM_CUSTOMERS = 25000
+CURRENT_DATE = np.datetime64('2026-02-10', 'D')
 TARGET_CHURN_RATE = 0.27
 CHURN_THRESHOLD_DAYS = 90
 ENGAGEMENT_DECAY_RATE = 0.15
+FAKER_POOL_SIZE = 2000
+FAKER_POOL_CACHE_DIR = Path.home() / '.cache' / 'churn_project'
+EMAIL_DOMAINS = ['example.com', 'example.net', 'example.org']
+PARQUET_ROW_GROUP_SIZE = 200_000
+STREAM_CHUNK_CUSTOMERS = 2000
+
+CONTRACT_TYPES = ['Month-to-month', 'One year', 'Two year']
+PLAN_TYPES = ['Basic', 'Standard', 'Premium']
+# Monthly charge range (low, high) per plan, indexed by PLAN_TYPES position
+PLAN_PRICE_RANGES = np.array([[9.99, 29.99], [30.00, 54.99], [55.00, 79.99]])
+
+# Character positions of the 32 hex digits inside a hyphenated 36-character UUID
+_UUID_HEX_POSITIONS = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+
+def bulk_uuid4(n, rng=None):
+    """Generate n random RFC 4122 version-4 UUID strings from a single random buffer."""
+    if rng is None:
+        rng = RNG
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    
+    hex_digits = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype=np.uint8).reshape(n, 32)
+    chars = np.full((n, 36), ord('-'), dtype=np.uint8)
+    chars[:, _UUID_HEX_POSITIONS] = hex_digits
+    return chars.view('S36').ravel().astype(str)
+
+def build_faker_pools(pool_size=FAKER_POOL_SIZE):
+    """Pre-generate pools of Faker names and locations to sample customer attributes from."""
+    return {
+        'first_name': np.array([fake.first_name() for _ in range(pool_size)]),
+        'last_name': np.array([fake.last_name() for _ in range(pool_size)]),
+        'city': np.array([fake.city() for _ in range(pool_size)]),
+        'state': np.array([fake.state_abbr() for _ in range(pool_size)]),
+    }
+
+def load_faker_pools(seed=SEED, pool_size=FAKER_POOL_SIZE, cache_dir=FAKER_POOL_CACHE_DIR):
+    """
+    Load the Faker pools from the on-disk cache, building and caching them on a miss.
+    
+    The cache file is keyed by Faker locale, Faker version, seed and pool size, so
+    any change to those produces a fresh pool.
+    """
+    locale = '-'.join(fake.locales)
+    cache_path = cache_dir / f"faker_pools_{locale}_{faker.VERSION}_{seed}_{pool_size}.pkl"
+    
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            print(f"Warning: Ignoring unreadable Faker pool cache at {cache_path}")
+    
+    Faker.seed(seed)
+    pools = build_faker_pools(pool_size)
+    
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(pools, f)
+    except OSError as e:
+        print(f"Warning: Could not cache Faker pools at {cache_path}: {e}")
+    
+    return pools
 
-def generate_customers():
+def generate_customers(num_customers=NUM_CUSTOMERS, seed=SEED):
     """Generate customer data with demographics, acquisition, and engagement information."""
     print("Generating customers data...")
     
-    customers = []
-    signup_start = datetime(2022, 1, 1)
-    signup_end = datetime(2025, 6, 30)
+    n = num_customers
+    signup_start = np.datetime64('2022-01-01', 'D')
+    signup_end = np.datetime64('2025-06-30', 'D')
     
     acquisition_channels = ['Organic Search', 'Paid Search', 'Social Media', 'Referral', 'Email', 'Direct']
     device_types = ['Desktop', 'Mobile', 'Tablet']
     timezones = ['America/New_York', 'America/Chicago', 'America/Denver', 'America/Los_Angeles', 
                  'America/Toronto', 'Europe/London', 'Asia/Tokyo']
+    genders = ['Male', 'Female', 'Other']
+    segments = ['Consumer', 'Corporate', 'Home Office']
+    languages = ['English', 'Spanish', 'French']
+    
+    def sample_categorical(categories, p=None):
+        # Draw integer codes and wrap them, instead of materializing an array of Python strings
+        codes = RNG.choice(len(categories), size=n, p=p).astype(np.int8)
+        return pd.Categorical.from_codes(codes, categories=categories)
+    
+    # Pick signup dates by index into the full daily range, which is built once
+    signup_days = np.arange(signup_start, signup_end + np.timedelta64(1, 'D'))
+    signup_date = signup_days[RNG.integers(0, len(signup_days), n)]
+    
+    acquisition_channel = sample_categorical(acquisition_channels, p=[0.25, 0.20, 0.20, 0.15, 0.10, 0.10])
+    is_referral = acquisition_channel.codes == acquisition_channels.index('Referral')
+    
+    pools = load_faker_pools(seed)
+    first_name = pools['first_name'][RNG.integers(0, len(pools['first_name']), n)]
+    last_name = pools['last_name'][RNG.integers(0, len(pools['last_name']), n)]
+    
+    # Emails are derived from the sampled names (first.last<n>@domain) instead of separate Faker calls
+    email = np.char.add(np.char.add(np.char.lower(first_name), '.'), np.char.lower(last_name))
+    email = np.char.add(email, RNG.integers(1, 1000, n).astype(str))
+    email = np.char.add(np.char.add(email, '@'), RNG.choice(EMAIL_DOMAINS, size=n))
+    
+    df = pd.DataFrame({
+        'customer_id': bulk_uuid4(n),
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        'age': RNG.integers(18, 76, n),
+        'gender': sample_categorical(genders, p=[0.48, 0.48, 0.04]),
+        'signup_date': signup_date.astype('datetime64[ns]'),
+        'city': pools['city'][RNG.integers(0, len(pools['city']), n)],
+        'state': pools['state'][RNG.integers(0, len(pools['state']), n)],
+        'segment': sample_categorical(segments, p=[0.6, 0.25, 0.15]),
+        'acquisition_channel': acquisition_channel,
+        'device_type': sample_categorical(device_types, p=[0.45, 0.45, 0.10]),
+        'timezone': sample_categorical(timezones),
+        'preferred_language': sample_categorical(languages, p=[0.80, 0.15, 0.05]),
+        'customer_lifetime_days': (CURRENT_DATE - signup_date).astype(int),
+        'initial_referral_credits': np.where(is_referral, RNG.integers(0, 51, n), 0)
+    }, copy=False)
+    df = df.astype({
+        'age': 'int8',
+        'customer_lifetime_days': 'int16',
+        'initial_referral_credits': 'int8'
+    })
     
-    for _ in range(NUM_CUSTOMERS):
-        signup_date = fake.date_between(start_date=signup_start, end_date=signup_end)
-        if not isinstance(signup_date, datetime):
-            signup_date = datetime.combine(signup_date, datetime.min.time())
-        
-        acquisition_channel = np.random.choice(acquisition_channels, p=[0.25, 0.20, 0.20, 0.15, 0.10, 0.10])
-        
-        customer = {
-            'customer_id': str(uuid.uuid4()),
-            'first_name': fake.first_name(),
-            'last_name': fake.last_name(),
-            'email': fake.email(),
-            'age': np.random.randint(18, 76),
-            'gender': np.random.choice(['Male', 'Female', 'Other'], p=[0.48, 0.48, 0.04]),
-            'signup_date': signup_date,
-            'city': fake.city(),
-            'state': fake.state_abbr(),
-            'segment': np.random.choice(['Consumer', 'Corporate', 'Home Office'], p=[0.6, 0.25, 0.15]),
-            'acquisition_channel': acquisition_channel,
-            'device_type': np.random.choice(device_types, p=[0.45, 0.45, 0.10]),
-            'timezone': np.random.choice(timezones),
-            'preferred_language': np.random.choice(['English', 'Spanish', 'French'], p=[0.80, 0.15, 0.05]),
-            'customer_lifetime_days': (datetime(2026, 2, 10) - signup_date).days,
-            'initial_referral_credits': np.random.randint(0, 51) if acquisition_channel == 'Referral' else 0
-        }
-        customers.append(customer)
-    
-    df = pd.DataFrame(customers)
     print(f"Generated {len(df)} customers")
     return df
 
-def generate_subscriptions(customers_df):
-    """Generate subscription data with churn probability based on contract type and tenure."""
-    print("Generating subscriptions data...")
+def _subscription_terms_numpy(plan_code, contract_code, age, tenure_days, u_price, u_churn, u_days):
+    """Vectorized NumPy version of the subscription pricing and churn kernel."""
+    price_low = PLAN_PRICE_RANGES[plan_code, 0]
+    price_high = PLAN_PRICE_RANGES[plan_code, 1]
+    monthly_charges = np.round(price_low + u_price * (price_high - price_low), 2)
     
-    subscriptions = []
-    current_date = datetime(2026, 2, 10)
+    # Calculate churn probability
+    churn_prob = (
+        0.15
+        + 0.20 * (contract_code == 0)
+        + 0.15 * (tenure_days < 180)
+        + 0.10 * (monthly_charges > 60)
+        + 0.05 * (age < 25)
+    )
     
-    for _, customer in customers_df.iterrows():
-        signup_date = customer['signup_date']
-        tenure_days = (current_date - signup_date).days
-        
-        contract_type = np.random.choice(
-            ['Month-to-month', 'One year', 'Two year'],
-            p=[0.55, 0.30, 0.15]
-        )
-        
-        plan_type = np.random.choice(
-            ['Basic', 'Standard', 'Premium'],
-            p=[0.40, 0.35, 0.25]
-        )
-        
-        if plan_type == 'Basic':
-            monthly_charges = round(np.random.uniform(9.99, 29.99), 2)
-        elif plan_type == 'Standard':
-            monthly_charges = round(np.random.uniform(30.00, 54.99), 2)
-        else:
-            monthly_charges = round(np.random.uniform(55.00, 79.99), 2)
-        
-        # Calculate churn probability
-        churn_prob = 0.15
-        if contract_type == 'Month-to-month':
-            churn_prob += 0.20
-        if tenure_days < 180:
-            churn_prob += 0.15
-        if monthly_charges > 60:
-            churn_prob += 0.10
-        if customer['age'] < 25:
-            churn_prob += 0.05
-        
-        is_churned = np.random.random() < churn_prob
+    is_churned = u_churn < churn_prob
+    
+    # Churned customers lapsed past the churn threshold (bounded by tenure), active ones paid recently
+    max_days = np.minimum(tenure_days, 365)
+    short_tenure = max_days <= CHURN_THRESHOLD_DAYS + 1
+    churned_low = np.where(short_tenure, np.maximum(1, tenure_days // 2), CHURN_THRESHOLD_DAYS + 1)
+    churned_high = np.where(short_tenure, np.maximum(2, tenure_days), max_days)
+    
+    low = np.where(is_churned, churned_low, 0)
+    high = np.where(is_churned, churned_high, 30)
+    days_since_last_payment = low + (u_days * (high - low)).astype(np.int64)
+    
+    return monthly_charges, is_churned, days_since_last_payment
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _subscription_terms_numba(plan_code, contract_code, age, tenure_days, u_price, u_churn, u_days):
+        """Fused single-pass version of _subscription_terms_numpy, compiled with Numba."""
+        n = len(plan_code)
+        monthly_charges = np.empty(n, dtype=np.float64)
+        is_churned = np.empty(n, dtype=np.bool_)
+        days_since_last_payment = np.empty(n, dtype=np.int64)
         
-        if is_churned:
-            max_days = min(tenure_days, 365)
-            if max_days <= CHURN_THRESHOLD_DAYS + 1:
-                days_since_last_payment = np.random.randint(max(1, tenure_days // 2), max(2, tenure_days))
+        for i in prange(n):
+            price_low = PLAN_PRICE_RANGES[plan_code[i], 0]
+            price_high = PLAN_PRICE_RANGES[plan_code[i], 1]
+            price = np.round(price_low + u_price[i] * (price_high - price_low), 2)
+            
+            churn_prob = 0.15
+            if contract_code[i] == 0:
+                churn_prob += 0.20
+            if tenure_days[i] < 180:
+                churn_prob += 0.15
+            if price > 60:
+                churn_prob += 0.10
+            if age[i] < 25:
+                churn_prob += 0.05
+            churned = u_churn[i] < churn_prob
+            
+            if churned:
+                max_days = min(tenure_days[i], 365)
+                if max_days <= CHURN_THRESHOLD_DAYS + 1:
+                    low = max(1, tenure_days[i] // 2)
+                    high = max(2, tenure_days[i])
+                else:
+                    low = CHURN_THRESHOLD_DAYS + 1
+                    high = max_days
             else:
-                days_since_last_payment = np.random.randint(CHURN_THRESHOLD_DAYS + 1, max_days)
-            last_payment_date = current_date - timedelta(days=days_since_last_payment)
-            is_active = 0
-        else:
-            days_since_last_payment = np.random.randint(0, 30)
-            last_payment_date = current_date - timedelta(days=days_since_last_payment)
-            is_active = 1
+                low = 0
+                high = 30
+            
+            monthly_charges[i] = price
+            is_churned[i] = churned
+            days_since_last_payment[i] = low + int(u_days[i] * (high - low))
         
-        subscription = {
-            'customer_id': customer['customer_id'],
-            'plan_type': plan_type,
-            'monthly_charges': monthly_charges,
-            'contract_type': contract_type,
-            'last_payment_date': last_payment_date,
-            'is_active': is_active
-        }
-        subscriptions.append(subscription)
-    
-    df = pd.DataFrame(subscriptions)
+        return monthly_charges, is_churned, days_since_last_payment
+
+def generate_subscriptions(customers_df):
+    """Generate subscription data with churn probability based on contract type and tenure."""
+    print("Generating subscriptions data...")
+    
+    n = len(customers_df)
+    signup_date = customers_df['signup_date'].to_numpy().astype('datetime64[D]')
+    tenure_days = (CURRENT_DATE - signup_date).astype(np.int64)
+    age = customers_df['age'].to_numpy()
+    
+    contract_code = RNG.choice(len(CONTRACT_TYPES), size=n, p=[0.55, 0.30, 0.15]).astype(np.int8)
+    plan_code = RNG.choice(len(PLAN_TYPES), size=n, p=[0.40, 0.35, 0.25]).astype(np.int8)
+    
+    subscription_terms = _subscription_terms_numba if NUMBA_AVAILABLE else _subscription_terms_numpy
+    monthly_charges, is_churned, days_since_last_payment = subscription_terms(
+        plan_code, contract_code, age, tenure_days, RNG.random(n), RNG.random(n), RNG.random(n)
+    )
+    
+    last_payment_date = CURRENT_DATE - days_since_last_payment.astype('timedelta64[D]')
+    
+    df = pd.DataFrame({
+        'customer_id': customers_df['customer_id'].to_numpy(),
+        'plan_type': pd.Categorical.from_codes(plan_code, categories=PLAN_TYPES),
+        'monthly_charges': monthly_charges,
+        'contract_type': pd.Categorical.from_codes(contract_code, categories=CONTRACT_TYPES),
+        'last_payment_date': last_payment_date.astype('datetime64[ns]'),
+        'is_active': (~is_churned).astype(int)
+    }, copy=False)
+    df = df.astype({
+        'monthly_charges': 'float32',
+        'is_active': 'int8'
+    })
+    
     churn_rate = (df['is_active'] == 0).sum() / len(df)
     print(f"Generated {len(df)} subscriptions (Churn rate: {churn_rate:.2%})")
     return df
 
-def generate_behavioral_events(customers_df, subscriptions_df):
-    """Generate behavioral events for product analytics (logins, feature usage, support tickets)."""
-    print("Generating behavioral events data...")
+def _expand_dates(start_dates, end_dates, counts, rng):
+    """
+    Expand per-customer date windows into one row per record.
+    
+    Returns the customer row index of every record and a date drawn uniformly
+    (inclusive of both ends) from that customer's window.
+    """
+    idx = np.repeat(np.arange(len(counts)), counts)
+    start_days = start_dates.astype('datetime64[D]').astype(np.int64)
+    end_days = end_dates.astype('datetime64[D]').astype(np.int64)
+    epoch_days = rng.integers(start_days[idx], end_days[idx] + 1)
+    return idx, epoch_days.astype('datetime64[D]').astype('datetime64[ns]')
+
+def _seed_sequence(seed):
+    """Wrap an int seed in a SeedSequence; SeedSequences are passed through unchanged."""
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+def _generate_sharded(generate_chunk, merged, seed_seq, n_jobs):
+    """
+    Run a per-customer generator over merged in parallel and join the results in memory.
     
-    merged = customers_df.merge(subscriptions_df, on='customer_id')
-    events = []
-    current_date = datetime(2026, 2, 10)
+    The work is split into the same fixed-size blocks that _iter_chunks streams, so the
+    output for a given seed is identical whatever n_jobs or output format is used.
+    """
+    parts = list(_iter_chunks(generate_chunk, merged, seed_seq, n_jobs))
+    if not parts:
+        return generate_chunk(merged, seed_seq)
+    return pd.concat(parts, ignore_index=True)
+
+def merge_customer_subscriptions(customers_df, subscriptions_df):
+    """Join the customer and subscription columns the transaction and event generators need."""
+    return customers_df[['customer_id', 'signup_date', 'device_type']].merge(
+        subscriptions_df[['customer_id', 'last_payment_date', 'is_active']], on='customer_id'
+    )
+
+def _iter_chunks(generate_chunk, merged, seed_seq, n_jobs, chunk_size=STREAM_CHUNK_CUSTOMERS):
+    """
+    Yield the output of a per-customer generator over fixed-size blocks of merged, in order.
+    
+    Blocks are generated in parallel but handed back one at a time as they finish, so the caller
+    never has to hold more than a few blocks in memory. Every block gets its own child SeedSequence
+    spawned from seed_seq and builds its Generator inside the worker, so the blocks (and their random
+    streams) depend only on the seed and chunk_size, never on n_jobs. SeedSequences are passed rather
+    than Generators because an unpickled Generator spawns its children from fresh OS entropy.
+    """
+    bounds = np.append(np.arange(0, len(merged), chunk_size), len(merged))
+    n_chunks = len(bounds) - 1
+    return Parallel(n_jobs=min(effective_n_jobs(n_jobs), max(1, n_chunks)), backend='loky', return_as='generator')(
+        delayed(generate_chunk)(merged.iloc[start:stop], chunk_seed)
+        for start, stop, chunk_seed in zip(bounds[:-1], bounds[1:], seed_seq.spawn(n_chunks))
+    )
+
+def _run_in_worker(generate, *args):
+    """
+    Run a generator inside a process pool worker and then stop its loky workers.
+    
+    A worker waits for its child processes when it exits, so without the shutdown every pool worker
+    that sharded its work would linger until loky's idle timeout (five minutes) ran out.
+    """
+    try:
+        return generate(*args)
+    finally:
+        get_reusable_executor().shutdown(wait=True)
+
+def _stream_parquet(chunks, path, dtypes):
+    """Append each generated chunk to a zstd-compressed Parquet file and return the total row count."""
+    num_rows = 0
+    writer = None
+    try:
+        for df in chunks:
+            table = _to_arrow_table(df.astype(dtypes))
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_SIZE)
+            num_rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return num_rows
+
+EVENT_DTYPES = {
+    'session_duration_minutes': 'float32',
+    'pages_viewed': 'Int8'
+}
+
+TRANSACTION_DTYPES = {
+    'quantity': 'int8'
+}
+
+def _generate_events_chunk(merged, seed):
+    """Generate the behavioral events for one shard of merged customers + subscriptions."""
+    rng = np.random.default_rng(seed)
+    n = len(merged)
     
     event_types = {
         'login': 0.50,
@@ -152,183 +377,295 @@ def generate_behavioral_events(customers_df, subscriptions_df):
         'app_crash': 0.02
     }
     
-    for _, customer in merged.iterrows():
-        signup_date = customer['signup_date']
-        if not isinstance(signup_date, datetime):
-            signup_date = datetime.combine(signup_date, datetime.min.time())
-        
-        is_churned = customer['is_active'] == 0
-        last_payment_date = customer['last_payment_date']
-        if not isinstance(last_payment_date, datetime):
-            last_payment_date = datetime.combine(last_payment_date, datetime.min.time())
-        
-        tenure_days = (current_date - signup_date).days
-        
-        if is_churned:
-            event_end_date = last_payment_date - timedelta(days=np.random.randint(0, min(30, tenure_days // 4)))
-            num_events = max(5, int(np.random.poisson(20)))
-        else:
-            event_end_date = current_date - timedelta(days=np.random.randint(0, 3))
-            base_events = max(10, tenure_days // 7)
-            num_events = int(np.random.poisson(base_events * 1.5))
-        
-        event_start_date = signup_date
-        
-        if not isinstance(event_start_date, datetime):
-            event_start_date = datetime.combine(event_start_date, datetime.min.time())
-        if not isinstance(event_end_date, datetime):
-            event_end_date = datetime.combine(event_end_date, datetime.min.time())
-        
-        if event_start_date > event_end_date:
-            event_start_date = event_end_date - timedelta(days=max(1, tenure_days // 3))
-        
-        for _ in range(num_events):
-            event_date = fake.date_between(
-                start_date=event_start_date,
-                end_date=event_end_date
-            )
-            if not isinstance(event_date, datetime):
-                event_date = datetime.combine(event_date, datetime.min.time())
-            
-            event_type = np.random.choice(
-                list(event_types.keys()),
-                p=list(event_types.values())
-            )
-            
-            session_duration_minutes = np.random.exponential(scale=12) if event_type == 'login' else None
-            if session_duration_minutes:
-                session_duration_minutes = min(session_duration_minutes, 120)
-            
-            event = {
-                'event_id': str(uuid.uuid4()),
-                'customer_id': customer['customer_id'],
-                'event_date': event_date,
-                'event_type': event_type,
-                'device_type': customer['device_type'],
-                'session_duration_minutes': round(session_duration_minutes, 2) if session_duration_minutes else None,
-                'pages_viewed': np.random.randint(1, 15) if event_type in ['login', 'feature_browse'] else None
-            }
-            events.append(event)
-    
-    df = pd.DataFrame(events)
+    signup_date = merged['signup_date'].to_numpy().astype('datetime64[D]')
+    last_payment_date = merged['last_payment_date'].to_numpy().astype('datetime64[D]')
+    is_churned = merged['is_active'].to_numpy() == 0
+    tenure_days = (CURRENT_DATE - signup_date).astype(np.int64)
+    
+    # Churned customers go quiet shortly before their last payment; active ones are still engaging
+    num_events = rng.poisson(np.where(is_churned, 20, np.maximum(10, tenure_days // 7) * 1.5))
+    num_events = np.where(is_churned, np.maximum(5, num_events), num_events)
+    
+    end_lag_days = np.where(
+        is_churned,
+        rng.integers(0, np.minimum(30, tenure_days // 4)),
+        rng.integers(0, 3, n)
+    )
+    end_anchor = np.where(is_churned, last_payment_date, CURRENT_DATE)
+    event_end_date = end_anchor - end_lag_days.astype('timedelta64[D]')
+    
+    event_start_date = signup_date
+    inverted = event_start_date > event_end_date
+    fallback_start = event_end_date - np.maximum(1, tenure_days // 3).astype('timedelta64[D]')
+    event_start_date = np.where(inverted, fallback_start, event_start_date)
+    
+    idx, event_date = _expand_dates(event_start_date, event_end_date, num_events, rng)
+    num_rows = len(idx)
+    
+    event_names = list(event_types.keys())
+    event_code = rng.choice(len(event_names), size=num_rows, p=list(event_types.values())).astype(np.int8)
+    
+    is_login = event_code == event_names.index('login')
+    session_duration_minutes = np.minimum(rng.exponential(scale=12, size=num_rows), 120)
+    np.round(session_duration_minutes, 2, out=session_duration_minutes)
+    session_duration_minutes[~is_login] = np.nan
+    pages_viewed = np.where(
+        is_login | (event_code == event_names.index('feature_browse')),
+        rng.integers(1, 15, num_rows),
+        np.nan
+    )
+    
+    df = pd.DataFrame({
+        'event_id': bulk_uuid4(num_rows, rng),
+        'customer_id': merged['customer_id'].to_numpy()[idx],
+        'event_date': event_date,
+        'event_type': pd.Categorical.from_codes(event_code, categories=event_names),
+        'device_type': pd.Categorical.from_codes(
+            merged['device_type'].cat.codes.to_numpy()[idx], dtype=merged['device_type'].dtype
+        ),
+        'session_duration_minutes': session_duration_minutes,
+        'pages_viewed': pages_viewed
+    }, copy=False)
+    return df
+
+def generate_behavioral_events(merged, seed=None, n_jobs=1, out_path=None):
+    """
+    Generate behavioral events for product analytics (logins, feature usage, support tickets).
+    
+    merged holds one row per customer with its subscription columns (see merge_customer_subscriptions).
+    
+    seed is an int or np.random.SeedSequence (default SEED + 2); the same seed always gives the same events.
+    
+    If out_path is given, events are streamed to that Parquet file block by block and only the
+    number of events written is returned.
+    """
+    seed_seq = _seed_sequence(SEED + 2 if seed is None else seed)
+    print("Generating behavioral events data...")
+    
+    if out_path is not None:
+        num_rows = _stream_parquet(_iter_chunks(_generate_events_chunk, merged, seed_seq, n_jobs), out_path, EVENT_DTYPES)
+        print(f"Generated {num_rows} behavioral events")
+        return num_rows
+    
+    df = _generate_sharded(_generate_events_chunk, merged, seed_seq, n_jobs)
+    df = df.astype(EVENT_DTYPES)
+    
     print(f"Generated {len(df)} behavioral events")
     return df
 
-def generate_transactions(customers_df, subscriptions_df):
-    """Generate transaction data with realistic patterns for active and churned customers."""
+def _generate_transactions_chunk(merged, seed):
+    """Generate the transactions for one shard of merged customers + subscriptions."""
+    rng = np.random.default_rng(seed)
+    n = len(merged)
+    
+    # Unit price range (low, high) for each product category
+    category_price_ranges = {
+        'Electronics': (50, 500),
+        'Clothing': (15, 150),
+        'Groceries': (5, 50),
+        'Home': (20, 300),
+        'Sports': (10, 200)
+    }
+    product_categories = list(category_price_ranges.keys())
+    payment_methods = ['Credit', 'Debit', 'Cash', 'Digital Wallet']
+    
+    signup_date = merged['signup_date'].to_numpy().astype('datetime64[D]')
+    last_payment_date = merged['last_payment_date'].to_numpy().astype('datetime64[D]')
+    is_churned = merged['is_active'].to_numpy() == 0
+    tenure_days = (CURRENT_DATE - signup_date).astype(np.int64)
+    
+    num_transactions = rng.poisson(np.where(is_churned, 5, np.maximum(1, tenure_days // 30) * 0.8))
+    num_transactions = np.where(is_churned, np.maximum(1, num_transactions), num_transactions)
+    
+    end_lag_days = np.where(
+        is_churned,
+        rng.integers(0, np.minimum(60, tenure_days // 2)),
+        rng.integers(0, 7, n)
+    )
+    end_anchor = np.where(is_churned, last_payment_date, CURRENT_DATE)
+    transaction_end_date = end_anchor - end_lag_days.astype('timedelta64[D]')
+    
+    transaction_start_date = signup_date
+    inverted = transaction_start_date > transaction_end_date
+    fallback_start = transaction_end_date - np.maximum(1, tenure_days // 2).astype('timedelta64[D]')
+    transaction_start_date = np.where(inverted, fallback_start, transaction_start_date)
+    
+    idx, transaction_date = _expand_dates(transaction_start_date, transaction_end_date, num_transactions, rng)
+    num_rows = len(idx)
+    
+    category_code = rng.choice(len(product_categories), size=num_rows).astype(np.int8)
+    quantity = rng.integers(1, 6, num_rows)
+    
+    price_ranges = np.array(list(category_price_ranges.values()))
+    price_low = price_ranges[category_code, 0]
+    price_high = price_ranges[category_code, 1]
+    unit_price = rng.uniform(price_low, price_high)
+    np.round(unit_price, 2, out=unit_price)
+    
+    # Round each money column once, in place, and narrow it to float32 in the same step
+    total_amount = unit_price * quantity
+    np.round(total_amount, 2, out=total_amount)
+    unit_price = unit_price.astype(np.float32)
+    total_amount = total_amount.astype(np.float32)
+    
+    df = pd.DataFrame({
+        'transaction_id': bulk_uuid4(num_rows, rng),
+        'customer_id': merged['customer_id'].to_numpy()[idx],
+        'transaction_date': transaction_date,
+        'product_category': pd.Categorical.from_codes(category_code, categories=product_categories),
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'total_amount': total_amount,
+        'payment_method': pd.Categorical.from_codes(
+            rng.choice(len(payment_methods), size=num_rows).astype(np.int8), categories=payment_methods
+        )
+    }, copy=False)
+    return df
+
+def generate_transactions(merged, seed=None, n_jobs=1, out_path=None):
+    """
+    Generate transaction data with realistic patterns for active and churned customers.
+    
+    merged holds one row per customer with its subscription columns (see merge_customer_subscriptions).
+    
+    seed is an int or np.random.SeedSequence (default SEED + 1); the same seed always gives the same
+    transactions.
+    
+    If out_path is given, transactions are streamed to that Parquet file block by block and only
+    the number of transactions written is returned.
+    """
+    seed_seq = _seed_sequence(SEED + 1 if seed is None else seed)
     print("Generating transactions data...")
     
-    merged = customers_df.merge(subscriptions_df, on='customer_id')
-    transactions = []
-    current_date = datetime(2026, 2, 10)
+    if out_path is not None:
+        num_rows = _stream_parquet(
+            _iter_chunks(_generate_transactions_chunk, merged, seed_seq, n_jobs), out_path, TRANSACTION_DTYPES
+        )
+        print(f"Generated {num_rows} transactions")
+        return num_rows
     
-    product_categories = ['Electronics', 'Clothing', 'Groceries', 'Home', 'Sports']
-    payment_methods = ['Credit', 'Debit', 'Cash', 'Digital Wallet']
+    df = _generate_sharded(_generate_transactions_chunk, merged, seed_seq, n_jobs)
+    df = df.astype(TRANSACTION_DTYPES)
     
-    for _, customer in merged.iterrows():
-        signup_date = customer['signup_date']
-        if not isinstance(signup_date, datetime):
-            signup_date = datetime.combine(signup_date, datetime.min.time())
-        
-        is_churned = customer['is_active'] == 0
-        last_payment_date = customer['last_payment_date']
-        if not isinstance(last_payment_date, datetime):
-            last_payment_date = datetime.combine(last_payment_date, datetime.min.time())
-        
-        tenure_days = (current_date - signup_date).days
-        
-        if is_churned:
-            num_transactions = max(1, int(np.random.poisson(5)))
-            transaction_end_date = last_payment_date - timedelta(days=np.random.randint(0, min(60, tenure_days // 2)))
-        else:
-            base_transactions = max(1, tenure_days // 30)
-            num_transactions = int(np.random.poisson(base_transactions * 0.8))
-            transaction_end_date = current_date - timedelta(days=np.random.randint(0, 7))
-        
-        transaction_start_date = signup_date
-        
-        if not isinstance(transaction_start_date, datetime):
-            transaction_start_date = datetime.combine(transaction_start_date, datetime.min.time())
-        if not isinstance(transaction_end_date, datetime):
-            transaction_end_date = datetime.combine(transaction_end_date, datetime.min.time())
-        
-        if transaction_start_date > transaction_end_date:
-            transaction_start_date = transaction_end_date - timedelta(days=max(1, tenure_days // 2))
-        
-        for _ in range(num_transactions):
-            transaction_date = fake.date_between(
-                start_date=transaction_start_date,
-                end_date=transaction_end_date
-            )
-            if not isinstance(transaction_date, datetime):
-                transaction_date = datetime.combine(transaction_date, datetime.min.time())
-            
-            product_category = np.random.choice(product_categories)
-            quantity = np.random.randint(1, 6)
-            
-            if product_category == 'Electronics':
-                unit_price = round(np.random.uniform(50, 500), 2)
-            elif product_category == 'Clothing':
-                unit_price = round(np.random.uniform(15, 150), 2)
-            elif product_category == 'Groceries':
-                unit_price = round(np.random.uniform(5, 50), 2)
-            elif product_category == 'Home':
-                unit_price = round(np.random.uniform(20, 300), 2)
-            else:
-                unit_price = round(np.random.uniform(10, 200), 2)
-            
-            total_amount = round(unit_price * quantity, 2)
-            
-            transaction = {
-                'transaction_id': str(uuid.uuid4()),
-                'customer_id': customer['customer_id'],
-                'transaction_date': transaction_date,
-                'product_category': product_category,
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'total_amount': total_amount,
-                'payment_method': np.random.choice(payment_methods)
-            }
-            transactions.append(transaction)
-    
-    df = pd.DataFrame(transactions)
     print(f"Generated {len(df)} transactions")
     return df
 
-def main():
-    """Main function to generate all datasets and save to CSV."""
+def _to_arrow_table(df):
+    """Convert a generated DataFrame to an Arrow table, storing timestamp columns as dates."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+    return table
+
+def write_csv(df, path):
+    """Write a DataFrame to CSV with the multithreaded Arrow writer."""
+    pacsv.write_csv(_to_arrow_table(df), path)
+
+def write_parquet(df, path):
+    """Write a DataFrame to a zstd-compressed Parquet file."""
+    pq.write_table(_to_arrow_table(df), path, compression='zstd', row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+}
+
+def main(output_format='csv', num_customers=NUM_CUSTOMERS, with_events=True, seed=SEED,
+         out_dir='data_generation'):
+    """Main function to generate all datasets and save them as CSV or Parquet."""
+    global RNG
+    RNG = np.random.default_rng(seed)
+    
     print("Starting synthetic data generation...")
     print("=" * 50)
     
-    customers_df = generate_customers()
+    customers_df = generate_customers(num_customers, seed)
     subscriptions_df = generate_subscriptions(customers_df)
-    transactions_df = generate_transactions(customers_df, subscriptions_df)
-    behavioral_events_df = generate_behavioral_events(customers_df, subscriptions_df)
+    merged = merge_customer_subscriptions(customers_df, subscriptions_df)
     
-    print("=" * 50)
-    print("Saving data to CSV files...")
+    os.makedirs(out_dir, exist_ok=True)
+    # Parquet files can be appended row group by row group, so the two large tables are streamed
+    # straight to disk by the workers instead of being collected in memory first.
+    stream = output_format == 'parquet'
     
-    customers_df.to_csv('data_generation/customers.csv', index=False)
-    print(f"Saved customers.csv ({len(customers_df)} rows)")
+    def out_path(name):
+        return os.path.join(out_dir, f"{name}.{output_format}") if stream else None
+    
+    # Transactions and events only depend on the merged customers + subscriptions, so build them side by side,
+    # each sharded over half of the available cores.
+    # Each generator has its own seed and splits its work into fixed-size blocks, so the core count only
+    # changes the speed, never the data. Workers are spawned rather than forked because forking after
+    # the Numba thread pool has started can deadlock.
+    n_jobs = max(1, (os.cpu_count() or 2) // 2)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as executor:
+        transactions_future = executor.submit(
+            _run_in_worker, generate_transactions, merged, np.random.SeedSequence(seed + 1), n_jobs,
+            out_path('transactions')
+        )
+        if with_events:
+            behavioral_events_future = executor.submit(
+                _run_in_worker, generate_behavioral_events, merged, np.random.SeedSequence(seed + 2), n_jobs,
+                out_path('behavioral_events')
+            )
+        transactions = transactions_future.result()
+        behavioral_events = behavioral_events_future.result() if with_events else None
     
-    subscriptions_df.to_csv('data_generation/subscriptions.csv', index=False)
-    print(f"Saved subscriptions.csv ({len(subscriptions_df)} rows)")
+    print("=" * 50)
+    print(f"Saving data to {output_format.upper()} files...")
     
-    transactions_df.to_csv('data_generation/transactions.csv', index=False)
-    print(f"Saved transactions.csv ({len(transactions_df)} rows)")
+    datasets = {
+        'customers': customers_df,
+        'subscriptions': subscriptions_df,
+        'transactions': transactions,
+    }
+    if with_events:
+        datasets['behavioral_events'] = behavioral_events
     
-    behavioral_events_df.to_csv('data_generation/behavioral_events.csv', index=False)
-    print(f"Saved behavioral_events.csv ({len(behavioral_events_df)} rows)")
+    write = WRITERS[output_format]
+    row_counts = {}
+    for name, data in datasets.items():
+        file_name = f"{name}.{output_format}"
+        if isinstance(data, pd.DataFrame):
+            write(data, os.path.join(out_dir, file_name))
+            row_counts[name] = len(data)
+        else:
+            row_counts[name] = data
+        print(f"Saved {file_name} ({row_counts[name]} rows)")
     
     print("=" * 50)
     print("Data generation completed successfully!")
     print("\nSummary Statistics:")
     print(f"Total Customers: {len(customers_df)}")
-    print(f"Total Transactions: {len(transactions_df)}")
-    print(f"Total Behavioral Events: {len(behavioral_events_df)}")
+    print(f"Total Transactions: {row_counts['transactions']}")
+    if with_events:
+        print(f"Total Behavioral Events: {row_counts['behavioral_events']}")
     print(f"Churn Rate: {(subscriptions_df['is_active'] == 0).sum() / len(subscriptions_df):.2%}")
-    print(f"Avg Transactions per Customer: {len(transactions_df) / len(customers_df):.1f}")
-    print(f"Avg Events per Customer: {len(behavioral_events_df) / len(customers_df):.1f}")
+    print(f"Avg Transactions per Customer: {row_counts['transactions'] / len(customers_df):.1f}")
+    if with_events:
+        print(f"Avg Events per Customer: {row_counts['behavioral_events'] / len(customers_df):.1f}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate synthetic churn project datasets.")
+    parser.add_argument(
+        '--format', dest='output_format', choices=sorted(WRITERS), default='csv',
+        help="Output file format (default: csv, which the Snowflake stage loads; parquet for local analysis)"
+    )
+    parser.add_argument('--num-customers', type=int, default=NUM_CUSTOMERS,
+                        help=f"Number of customers to generate (default: {NUM_CUSTOMERS})")
+    events_group = parser.add_mutually_exclusive_group()
+    events_group.add_argument('--with-events', dest='with_events', action='store_true', default=True,
+                              help="Generate behavioral events (default)")
+    events_group.add_argument('--no-events', dest='with_events', action='store_false',
+                              help="Skip behavioral event generation")
+    parser.add_argument('--seed', type=int, default=SEED, help=f"Random seed (default: {SEED})")
+    parser.add_argument('--out-dir', default='data_generation',
+                        help="Directory to write the output files to (default: data_generation)")
+    args = parser.parse_args()
+    main(
+        output_format=args.output_format,
+        num_customers=args.num_customers,
+        with_events=args.with_events,
+        seed=args.seed,
+        out_dir=args.out_dir
+    )
@@ -17,6 +17,7 @@ from .predict import (
     load_model,
     predict_churn,
     predict_single_customer,
+    assign_risk_category,
     load_model_metrics,
     load_feature_importance,
     get_model_comparison
@@ -31,6 +32,7 @@ __all__ = [
     'load_model',
     'predict_churn',
     'predict_single_customer',
+    'assign_risk_category',
     'load_model_metrics',
     'load_feature_importance',
     'get_model_comparison'
@@ -6,11 +6,17 @@ Handles data loading, feature selection, encoding, and train/test split
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 import snowflake.connector
-import pickle
+import joblib
 import os
 
+try:
+    import lz4  # noqa: F401  (enables joblib's lz4 compressor)
+    ARTIFACT_COMPRESSION = ('lz4', 3)
+except ImportError:
+    ARTIFACT_COMPRESSION = 0
+
 CHURN_THRESHOLD_DAYS = 90
 
 FEATURE_COLUMNS = [
@@ -68,8 +74,13 @@ CATEGORICAL_COLUMNS = [
     'device_type',
 ]
 
+_CATEGORICAL_SET = frozenset(CATEGORICAL_COLUMNS)
+
 TARGET_COLUMN = 'churn_flag'
 
+# Column types applied while parsing CSV exports
+CSV_DTYPES = {col: 'category' if col in _CATEGORICAL_SET else 'float64' for col in FEATURE_COLUMNS}
+
 
 def load_data_from_snowflake(credentials):
     """
@@ -92,24 +103,48 @@ def load_data_from_snowflake(credentials):
     )
     
     query = "SELECT * FROM churn_features"
-    df = pd.read_sql(query, conn)
-    conn.close()
+    try:
+        # Fetch the result as Arrow batches instead of row-by-row DBAPI tuples
+        cur = conn.cursor()
+        cur.execute(query)
+        df = cur.fetch_pandas_all()
+    finally:
+        conn.close()
     
     return df
 
 
-def load_data_from_csv(csv_path):
+def csv_column_dtypes(csv_path):
     """
-    Load churn_features data from CSV export
+    Build the read_csv dtype mapping for the known feature columns of a CSV export
     
     Args:
         csv_path (str): Path to CSV file
         
+    Returns:
+        dict: Column name (as spelled in the file header) to dtype
+    """
+    # Headers may be uppercase (Snowflake exports), so match them case-insensitively
+    header = pd.read_csv(csv_path, nrows=0, compression='infer', encoding='utf-8').columns
+    return {col: CSV_DTYPES[col.lower()] for col in header if col.lower() in CSV_DTYPES}
+
+
+def load_data_from_csv(csv_path):
+    """
+    Load churn_features data from CSV export (or a Parquet file)
+    
+    Args:
+        csv_path (str): Path to CSV or .parquet file
+        
     Returns:
         pd.DataFrame: Raw data
     """
-    # Auto-detect compression (handles .gz files automatically)
-    df = pd.read_csv(csv_path, compression='infer', encoding='utf-8')
+    if str(csv_path).endswith('.parquet'):
+        df = pd.read_parquet(csv_path, engine='pyarrow')
+    else:
+        # Auto-detect compression (handles .gz files automatically)
+        df = pd.read_csv(csv_path, engine='pyarrow', dtype=csv_column_dtypes(csv_path),
+                         compression='infer', encoding='utf-8')
     
     # Normalize column names to lowercase (Snowflake exports uppercase)
     df.columns = df.columns.str.lower()
@@ -138,33 +173,47 @@ def prepare_features(df, feature_cols=None, categorical_cols=None, target_col=TA
     if categorical_cols is None:
         categorical_cols = CATEGORICAL_COLUMNS
     
-    df_work = df.copy()
-    
-    available_features = [col for col in feature_cols if col in df_work.columns]
-    missing_features = [col for col in feature_cols if col not in df_work.columns]
+    # Hash membership instead of scanning the column Index for every feature
+    columns = set(df.columns)
+    available_features = [col for col in feature_cols if col in columns]
+    missing_features = [col for col in feature_cols if col not in columns]
     if missing_features:
         print(f"Warning: The following features are not in the dataset: {missing_features}")
     
-    if target_col not in df_work.columns:
+    if target_col not in columns:
         raise ValueError(f"Target column '{target_col}' not found in dataset")
     
-    X_raw = df_work[available_features].copy()
-    y = df_work[target_col].copy()
-    
-    for col in X_raw.columns:
-        if X_raw[col].dtype in ['object', 'category']:
-            X_raw[col].fillna('MISSING', inplace=True)
-        else:
-            X_raw[col].fillna(X_raw[col].median(), inplace=True)
+    # Selecting the feature columns already yields a new frame, so it is filled and encoded in place
+    X_encoded = df.loc[:, available_features]
+    y = df[target_col]
+    
+    text_cols = X_encoded.select_dtypes(include='object').columns
+    category_cols = X_encoded.select_dtypes(include='category').columns
+    num_cols = X_encoded.columns.difference(text_cols.union(category_cols), sort=False)
+    X_encoded[text_cols] = X_encoded[text_cols].fillna('MISSING')
+    for col in category_cols:
+        if X_encoded[col].hasnans:
+            categories = X_encoded[col].cat.categories.union(['MISSING'])
+            X_encoded[col] = X_encoded[col].cat.set_categories(categories).fillna('MISSING')
+    
+    # Fill numeric gaps with column medians in one pass over the columns that have any
+    na_cols = num_cols[X_encoded[num_cols].isna().any().to_numpy()]
+    if len(na_cols):
+        values = X_encoded[na_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        medians = X_encoded[na_cols].median().to_numpy()
+        rows, cols = np.nonzero(np.isnan(values))
+        values[rows, cols] = np.take(medians, cols)
+        X_encoded[na_cols] = values
     
     encoders = {}
-    X_encoded = X_raw.copy()
+    available = set(available_features)
     
     for col in categorical_cols:
-        if col in X_encoded.columns:
-            le = LabelEncoder()
-            X_encoded[col] = le.fit_transform(X_encoded[col].astype(str))
-            encoders[col] = le
+        if col in available:
+            # Category codes follow the sorted category order, matching LabelEncoder
+            categories = X_encoded[col].astype(str).astype('category')
+            X_encoded[col] = categories.cat.codes.astype(np.int16)
+            encoders[col] = {category: code for code, category in enumerate(categories.cat.categories)}
     
     feature_names = X_encoded.columns.tolist()
     
@@ -176,8 +225,8 @@ def create_train_test_split(X, y, test_size=0.2, random_state=42):
     Create stratified train/test split
     
     Args:
-        X (pd.DataFrame): Features
-        y (pd.Series): Target
+        X (pd.DataFrame or np.ndarray): Features
+        y (pd.Series or np.ndarray): Target
         test_size (float): Proportion of test set
         random_state (int): Random seed
         
@@ -199,16 +248,19 @@ def scale_features(X_train, X_test):
     Scale features using StandardScaler
     
     Args:
-        X_train (pd.DataFrame): Training features
-        X_test (pd.DataFrame): Test features
+        X_train (pd.DataFrame or np.ndarray): Training features
+        X_test (pd.DataFrame or np.ndarray): Test features
         
     Returns:
-        tuple: (X_train_scaled, X_test_scaled, scaler)
+        tuple: (X_train_scaled, X_test_scaled, scaler), of the same type as the inputs
     """
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
     
+    if not isinstance(X_train, pd.DataFrame):
+        return X_train_scaled, X_test_scaled, scaler
+    
     X_train_scaled = pd.DataFrame(X_train_scaled, columns=X_train.columns, index=X_train.index)
     X_test_scaled = pd.DataFrame(X_test_scaled, columns=X_test.columns, index=X_test.index)
     
@@ -220,21 +272,16 @@ def save_preprocessors(encoders, scaler, feature_names, output_dir='ml/artifacts
     Save preprocessing artifacts for inference
     
     Args:
-        encoders (dict): Label encoders for categorical features
+        encoders (dict): Category-to-code mappings for categorical features
         scaler (StandardScaler): Feature scaler
         feature_names (list): List of feature names in order
         output_dir (str): Directory to save artifacts
     """
     os.makedirs(output_dir, exist_ok=True)
     
-    with open(f'{output_dir}/encoders.pkl', 'wb') as f:
-        pickle.dump(encoders, f)
-    
-    with open(f'{output_dir}/scaler.pkl', 'wb') as f:
-        pickle.dump(scaler, f)
-    
-    with open(f'{output_dir}/feature_names.pkl', 'wb') as f:
-        pickle.dump(feature_names, f)
+    joblib.dump(encoders, f'{output_dir}/encoders.pkl', compress=ARTIFACT_COMPRESSION)
+    joblib.dump(scaler, f'{output_dir}/scaler.pkl', compress=ARTIFACT_COMPRESSION)
+    joblib.dump(feature_names, f'{output_dir}/feature_names.pkl', compress=ARTIFACT_COMPRESSION)
     
     print(f"Preprocessors saved to {output_dir}")
 
@@ -249,20 +296,16 @@ def load_preprocessors(input_dir='ml/artifacts'):
     Returns:
         tuple: (encoders, scaler, feature_names)
     """
-    with open(f'{input_dir}/encoders.pkl', 'rb') as f:
-        encoders = pickle.load(f)
-    
-    with open(f'{input_dir}/scaler.pkl', 'rb') as f:
-        scaler = pickle.load(f)
-    
-    with open(f'{input_dir}/feature_names.pkl', 'rb') as f:
-        feature_names = pickle.load(f)
+    # joblib.load also reads artifacts written with plain pickle
+    encoders = joblib.load(f'{input_dir}/encoders.pkl')
+    scaler = joblib.load(f'{input_dir}/scaler.pkl')
+    feature_names = joblib.load(f'{input_dir}/feature_names.pkl')
     
     return encoders, scaler, feature_names
 
 
 def prepare_data_pipeline(data_source, credentials=None, csv_path=None, 
-                          test_size=0.2, random_state=42, scale=True):
+                          test_size=0.2, random_state=42, scale=True, return_numpy=False):
     """
     Complete data preparation pipeline
     
@@ -273,6 +316,8 @@ def prepare_data_pipeline(data_source, credentials=None, csv_path=None,
         test_size (float): Test set proportion
         random_state (int): Random seed
         scale (bool): Whether to scale features
+        return_numpy (bool): Return the splits as float64 / int8 arrays instead of pandas objects,
+            with column order given by feature_names
         
     Returns:
         dict: Dictionary containing all prepared data and artifacts
@@ -303,6 +348,11 @@ def prepare_data_pipeline(data_source, credentials=None, csv_path=None,
     X, y, feature_names, encoders = prepare_features(df)
     print(f"Prepared {len(feature_names)} features")
     
+    if return_numpy:
+        # Split and scale plain arrays so the models get them without another conversion
+        X = X.to_numpy(dtype=np.float64)
+        y = y.to_numpy(dtype=np.int8)
+    
     X_train, X_test, y_train, y_test = create_train_test_split(
         X, y, test_size=test_size, random_state=random_state
     )
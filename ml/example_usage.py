@@ -9,7 +9,7 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ml.data_prep import prepare_data_pipeline
+from ml.data_prep import prepare_data_pipeline, csv_column_dtypes
 from ml.train_model import train_pipeline
 from ml.predict import (
     load_best_model,
@@ -17,7 +17,10 @@ from ml.predict import (
     load_feature_importance,
     get_model_comparison,
     predict_churn,
+    predict_churn_parallel,
+    imputation_medians,
     predict_single_customer,
+    assign_risk_category,
     load_preprocessors
 )
 
@@ -106,11 +109,7 @@ def example_4_make_predictions_from_csv():
     results_df = sample_df[['customer_id', 'first_name', 'last_name']].copy()
     results_df['churn_probability'] = probabilities
     results_df['prediction'] = predictions
-    results_df['risk_category'] = pd.cut(
-        probabilities,
-        bins=[0, 0.3, 0.5, 0.7, 1.0],
-        labels=['Very Low Risk', 'Low Risk', 'Medium Risk', 'High Risk']
-    )
+    results_df['risk_category'] = assign_risk_category(probabilities)
     
     print("\nPrediction Results:")
     print(results_df.to_string(index=False))
@@ -196,32 +195,47 @@ def example_6_batch_scoring():
         print(f"Error: CSV file not found at {csv_path}")
         return
     
-    df = pd.read_csv(csv_path)
-    df.columns = df.columns.str.lower()
-    
     print(f"Loading model and preprocessors...")
     model = load_best_model()
     encoders, scaler, feature_names = load_preprocessors()
     
-    print(f"Scoring {len(df)} customers...")
-    predictions, probabilities = predict_churn(df, model, encoders, scaler, feature_names)
-    
-    df['ml_churn_probability'] = probabilities
-    df['ml_churn_prediction'] = predictions
-    df['ml_risk_category'] = pd.cut(
-        probabilities,
-        bins=[0, 0.3, 0.5, 0.7, 1.0],
-        labels=['Very Low Risk', 'Low Risk', 'Medium Risk', 'High Risk']
-    )
-    
-    high_risk = df[probabilities >= 0.7]
-    print(f"\nHigh-Risk Customers (probability >= 70%): {len(high_risk)}")
-    print(f"Medium-Risk Customers (probability 50-70%): {len(df[(probabilities >= 0.5) & (probabilities < 0.7)])}")
-    print(f"Low-Risk Customers (probability < 50%): {len(df[probabilities < 0.5])}")
-    
     output_path = "ml/artifacts/scored_customers.csv"
-    df.to_csv(output_path, index=False)
-    print(f"\nScored data saved to: {output_path}")
+    num_scored = num_high = num_medium = num_low = 0
+    dtypes = csv_column_dtypes(csv_path)
+    
+    # Missing values are filled with medians over the whole file, read from just the numeric feature
+    # columns first, so a customer's score does not depend on which chunk it lands in
+    numeric_cols = [col for col in dtypes if col.lower() in feature_names and col.lower() not in encoders]
+    numeric_df = pd.read_csv(csv_path, engine='pyarrow', usecols=numeric_cols,
+                             dtype={col: dtypes[col] for col in numeric_cols}, compression='infer')
+    numeric_df.columns = numeric_df.columns.str.lower()
+    medians = imputation_medians(numeric_df, encoders, feature_names)
+    del numeric_df
+    
+    # Stream the export in chunks so only one chunk has to fit in memory. This uses the C engine
+    # because pandas' pyarrow engine does not support chunksize.
+    reader = pd.read_csv(csv_path, chunksize=200_000, dtype=dtypes, compression='infer')
+    for i, chunk in enumerate(reader):
+        chunk.columns = chunk.columns.str.lower()
+        print(f"Scoring customers {num_scored + 1}-{num_scored + len(chunk)}...")
+        predictions, probabilities = predict_churn_parallel(chunk, model, encoders, scaler, feature_names,
+                                                            medians=medians)
+        
+        chunk['ml_churn_probability'] = probabilities
+        chunk['ml_churn_prediction'] = predictions
+        chunk['ml_risk_category'] = assign_risk_category(probabilities)
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        
+        num_scored += len(chunk)
+        num_high += int((probabilities >= 0.7).sum())
+        num_medium += int(((probabilities >= 0.5) & (probabilities < 0.7)).sum())
+        num_low += int((probabilities < 0.5).sum())
+    
+    print(f"\nHigh-Risk Customers (probability >= 70%): {num_high}")
+    print(f"Medium-Risk Customers (probability 50-70%): {num_medium}")
+    print(f"Low-Risk Customers (probability < 50%): {num_low}")
+    
+    print(f"\nScored data saved to: {output_path} ({num_scored} customers)")
 
 
 def main():
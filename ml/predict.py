@@ -5,14 +5,20 @@ Handles loading models and making predictions on new data
 
 import pandas as pd
 import numpy as np
-import pickle
+import joblib
 import os
 import json
+import functools
+import warnings
 
 # Resolve artifacts path relative to this file so it works when app runs from streamlit_app/
 _ML_DIR = os.path.dirname(os.path.abspath(__file__))
 ARTIFACTS_DIR = os.path.join(_ML_DIR, 'artifacts')
 
+# Churn probability thresholds between consecutive risk categories
+RISK_BIN_EDGES = np.array([0.3, 0.5, 0.7])
+RISK_LABELS = np.array(['Very Low Risk', 'Low Risk', 'Medium Risk', 'High Risk'])
+
 
 def load_model(model_name='xgboost'):
     """
@@ -24,15 +30,19 @@ def load_model(model_name='xgboost'):
     Returns:
         model: Loaded model
     """
+    native_path = f"{ARTIFACTS_DIR}/{model_name}/model.ubj"
+    if os.path.exists(native_path):
+        import xgboost as xgb
+        model = xgb.XGBClassifier()
+        model.load_model(native_path)
+        return model
+    
     model_path = f"{ARTIFACTS_DIR}/{model_name}/model.pkl"
     
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model not found at {model_path}")
     
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    
-    return model
+    return joblib.load(model_path)
 
 
 def load_best_model():
@@ -62,6 +72,34 @@ def load_preprocessors():
     return load_prep(ARTIFACTS_DIR)
 
 
+def _artifacts_version():
+    """Modification time of best_model_name.txt, which is rewritten every time the models are trained"""
+    try:
+        return os.path.getmtime(f"{ARTIFACTS_DIR}/best_model_name.txt")
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _load_best_model_cached(version):
+    return load_best_model()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_preprocessors_cached(version):
+    return load_preprocessors()
+
+
+def _cached_model():
+    """Best model, loaded from disk only when the artifacts have changed since the last call"""
+    return _load_best_model_cached(_artifacts_version())
+
+
+def _cached_preprocessors():
+    """Preprocessors, loaded from disk only when the artifacts have changed since the last call"""
+    return _load_preprocessors_cached(_artifacts_version())
+
+
 def load_model_metrics(model_name='xgboost'):
     """Load model evaluation metrics"""
     metrics_path = f"{ARTIFACTS_DIR}/{model_name}/metrics.json"
@@ -93,87 +131,240 @@ def load_shap_values(model_name='xgboost'):
     if not os.path.exists(shap_path):
         return None, None
     
-    with open(shap_path, 'rb') as f:
-        shap_data = pickle.load(f)
+    shap_data = joblib.load(shap_path)
     
     return shap_data['shap_values'], shap_data['explainer']
 
 
-def preprocess_input(df, encoders, feature_names):
+def imputation_medians(df, encoders, feature_names):
     """
-    Preprocess input data for prediction
+    Medians used to fill missing numeric values
     
     Args:
         df (pd.DataFrame): Input data
-        encoders (dict): Label encoders
+        encoders (dict): Category-to-code mappings per categorical column
         feature_names (list): List of required features
         
     Returns:
-        pd.DataFrame: Preprocessed data
+        np.ndarray: Median of each numeric feature in feature_names order (0 for categorical or absent features)
+    """
+    medians = np.zeros(len(feature_names))
+    columns = set(df.columns)
+    for i, col in enumerate(feature_names):
+        if col in columns and col not in encoders:
+            medians[i] = df[col].median()
+    return medians
+
+
+def preprocess_input(df, encoders, feature_names, medians=None):
     """
-    df_processed = df.copy()
+    Preprocess input data for prediction
     
-    for col in df_processed.columns:
-        if df_processed[col].dtype in ['object', 'category']:
-            df_processed[col].fillna('MISSING', inplace=True)
+    Args:
+        df (pd.DataFrame): Input data
+        encoders (dict): Category-to-code mappings per categorical column
+        feature_names (list): List of required features
+        medians (np.ndarray): Fill values for missing numeric features, aligned with feature_names
+            (if None, the medians of df are used; see imputation_medians)
+        
+    Returns:
+        np.ndarray: float64 feature matrix with columns in feature_names order
+    """
+    # Preprocessed features go straight into one matrix; features missing from the input stay 0
+    X = np.zeros((len(df), len(feature_names)))
+    fill_values = np.zeros(len(feature_names)) if medians is None else medians
+    columns = set(df.columns)
+    
+    for i, col in enumerate(feature_names):
+        if col not in columns:
+            continue
+        values = df[col]
+        if col in encoders:
+            # Encode the distinct labels once and gather by code; missing values take the 'MISSING'
+            # code and categories not seen during training fall back to the first code
+            mapping = encoders[col]
+            codes, uniques = pd.factorize(values)
+            lookup = [mapping.get(label, 0) for label in np.asarray(uniques).astype(str)]
+            lookup.append(mapping.get('MISSING', 0))
+            X[:, i] = np.asarray(lookup, dtype=np.float64)[codes]
         else:
-            df_processed[col].fillna(df_processed[col].median(), inplace=True)
+            X[:, i] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            if medians is None and values.hasnans:
+                fill_values[i] = values.median()
     
-    for col, encoder in encoders.items():
-        if col in df_processed.columns:
-            df_processed[col] = df_processed[col].astype(str)
-            known_classes = set(encoder.classes_)
-            df_processed[col] = df_processed[col].apply(
-                lambda x: x if x in known_classes else encoder.classes_[0]
-            )
-            df_processed[col] = encoder.transform(df_processed[col])
+    # Fill numeric gaps with their column medians in a single scatter over the matrix
+    rows, cols = np.nonzero(np.isnan(X))
+    X[rows, cols] = fill_values[cols]
     
-    available_features = [col for col in feature_names if col in df_processed.columns]
-    missing_features = [col for col in feature_names if col not in df_processed.columns]
+    return X
+
+
+def _is_missing(value):
+    """Scalar missing-value check for customer fields (NaN is the only value not equal to itself)"""
+    return value is None or value is pd.NA or value != value
+
+
+def customer_vector(customer_data, encoders, feature_names):
+    """
+    Build the model input row for a single customer without going through pandas
     
-    if missing_features:
-        for col in missing_features:
-            df_processed[col] = 0
+    Matches preprocess_input on a one-row frame: absent features are 0, categoricals are
+    mapped through encoders (unknown values fall back to code 0), numeric gaps stay NaN.
     
-    df_processed = df_processed[feature_names]
+    Args:
+        customer_data (dict): Customer feature data
+        encoders (dict): Category-to-code mappings per categorical column
+        feature_names (list): List of required features
+        
+    Returns:
+        np.ndarray: float64 array of shape (1, n_features)
+    """
+    row = np.zeros((1, len(feature_names)))
+    for i, col in enumerate(feature_names):
+        if col not in customer_data:
+            continue
+        value = customer_data[col]
+        if col in encoders:
+            row[0, i] = encoders[col].get('MISSING' if _is_missing(value) else str(value), 0)
+        else:
+            row[0, i] = np.nan if _is_missing(value) else value
+    return row
+
+
+def scale_input(X, scaler, copy=True):
+    """
+    Standardize preprocessed features with a fitted scaler
     
-    return df_processed
+    Args:
+        X (pd.DataFrame or np.ndarray): Preprocessed features
+        scaler (StandardScaler): Fitted scaler, or None to skip scaling
+        copy (bool): If False and X is already a float64 array, scale it in place
+        
+    Returns:
+        np.ndarray: float64 feature matrix
+    """
+    # Scoring stays in double precision, matching the float64 features the models were trained on
+    X_arr = np.array(X, dtype=np.float64, copy=copy)
+    if scaler is None:
+        return X_arr
+    
+    # Same arithmetic as StandardScaler.transform, done in place on one buffer
+    X_arr -= scaler.mean_
+    X_arr /= scaler.scale_
+    return X_arr
+
+
+def _predict_with_model(model, X_scaled):
+    """
+    Class predictions and churn probabilities for scaled model inputs
+    
+    Each model is scored once and the classes are thresholded from the probabilities, which is
+    what predict does internally. XGBoost models go through the booster's inplace_predict, which
+    skips DMatrix construction and the sklearn wrapper.
+    """
+    if hasattr(model, 'get_booster'):
+        try:
+            iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            iteration_range = (0, 0)
+        probabilities = model.get_booster().inplace_predict(
+            np.ascontiguousarray(X_scaled), iteration_range=iteration_range
+        )
+    else:
+        # Scaled features are passed as plain arrays, so sklearn's feature-name check does not apply
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            probabilities = model.predict_proba(X_scaled)[:, 1]
+    
+    return (probabilities > 0.5).astype(np.int8), probabilities
+
+
+def assign_risk_category(probabilities):
+    """
+    Map churn probabilities to risk categories
+    
+    Args:
+        probabilities (float or array-like): Churn probabilities
+        
+    Returns:
+        str or np.ndarray: Risk category label(s)
+    """
+    return RISK_LABELS[np.searchsorted(RISK_BIN_EDGES, probabilities, side='right')]
 
 
-def predict_churn(df, model=None, encoders=None, scaler=None, feature_names=None):
+def predict_churn(df, model=None, encoders=None, scaler=None, feature_names=None, medians=None):
     """
     Predict churn probability for new data
     
     Args:
         df (pd.DataFrame): Input data with features
         model: Trained model (if None, loads best model)
-        encoders: Label encoders (if None, loads from artifacts)
+        encoders: Category-to-code mappings (if None, loads from artifacts)
         scaler: Feature scaler (if None, loads from artifacts)
         feature_names: List of features (if None, loads from artifacts)
+        medians: Fill values for missing numeric features (if None, uses the medians of df)
         
     Returns:
         tuple: (predictions, probabilities)
     """
     if model is None:
-        model = load_best_model()
+        model = _cached_model()
     
     if encoders is None or scaler is None or feature_names is None:
-        encoders, scaler, feature_names = load_preprocessors()
+        encoders, scaler, feature_names = _cached_preprocessors()
     
-    X = preprocess_input(df, encoders, feature_names)
+    X_scaled = scale_input(preprocess_input(df, encoders, feature_names, medians), scaler, copy=False)
     
-    if scaler is not None:
-        X_scaled = scaler.transform(X)
-        X_scaled = pd.DataFrame(X_scaled, columns=X.columns, index=X.index)
-    else:
-        X_scaled = X
-    
-    predictions = model.predict(X_scaled)
-    probabilities = model.predict_proba(X_scaled)[:, 1]
+    predictions, probabilities = _predict_with_model(model, X_scaled)
     
     return predictions, probabilities
 
 
+def predict_churn_parallel(df, model=None, encoders=None, scaler=None, feature_names=None, n_jobs=-1,
+                           medians=None):
+    """
+    Predict churn for a large batch by scoring contiguous row chunks in parallel worker processes
+    
+    Missing numeric values are filled with the same medians in every chunk, so the result matches
+    predict_churn on the whole batch whatever n_jobs is.
+    
+    Args:
+        df (pd.DataFrame): Input data with features
+        model: Trained model (if None, loads best model)
+        encoders: Category-to-code mappings (if None, loads from artifacts)
+        scaler: Feature scaler (if None, loads from artifacts)
+        feature_names: List of features (if None, loads from artifacts)
+        n_jobs (int): Number of worker processes (-1 uses all cores)
+        medians: Fill values for missing numeric features (if None, uses the medians of the whole df)
+        
+    Returns:
+        tuple: (predictions, probabilities)
+    """
+    from joblib import Parallel, delayed, effective_n_jobs
+    
+    if model is None:
+        model = _cached_model()
+    
+    if encoders is None or scaler is None or feature_names is None:
+        encoders, scaler, feature_names = _cached_preprocessors()
+    
+    n_chunks = min(effective_n_jobs(n_jobs), max(1, len(df)))
+    if n_chunks == 1:
+        return predict_churn(df, model, encoders, scaler, feature_names, medians)
+    
+    if medians is None:
+        medians = imputation_medians(df, encoders, feature_names)
+    
+    # The loaded model, preprocessors and medians are shipped to the workers so they are not reloaded there
+    bounds = np.linspace(0, len(df), n_chunks + 1).astype(int)
+    results = Parallel(n_jobs=n_chunks, backend='loky')(
+        delayed(predict_churn)(df.iloc[start:stop], model, encoders, scaler, feature_names, medians)
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    )
+    predictions, probabilities = zip(*results)
+    return np.concatenate(predictions), np.concatenate(probabilities)
+
+
 def predict_single_customer(customer_data, model=None):
     """
     Predict churn for a single customer
@@ -185,29 +376,22 @@ def predict_single_customer(customer_data, model=None):
     Returns:
         dict: Prediction results with probability and risk category
     """
-    if isinstance(customer_data, dict):
-        df = pd.DataFrame([customer_data])
-    else:
-        df = pd.DataFrame([customer_data.to_dict()])
+    if model is None:
+        model = _cached_model()
+    encoders, scaler, feature_names = _cached_preprocessors()
     
-    predictions, probabilities = predict_churn(df, model=model)
+    if not isinstance(customer_data, dict):
+        customer_data = customer_data.to_dict()
     
-    probability = probabilities[0]
-    prediction = predictions[0]
+    X_scaled = scale_input(customer_vector(customer_data, encoders, feature_names), scaler, copy=False)
     
-    if probability >= 0.7:
-        risk_category = 'High Risk'
-    elif probability >= 0.5:
-        risk_category = 'Medium Risk'
-    elif probability >= 0.3:
-        risk_category = 'Low Risk'
-    else:
-        risk_category = 'Very Low Risk'
+    predictions, probabilities = _predict_with_model(model, X_scaled)
+    prediction, probability = predictions[0], probabilities[0]
     
     return {
         'prediction': int(prediction),
         'churn_probability': float(probability),
-        'risk_category': risk_category
+        'risk_category': str(assign_risk_category(probability))
     }
 
 
@@ -222,6 +406,72 @@ def get_model_comparison():
     return comparison_df
 
 
+@functools.lru_cache(maxsize=4)
+def _load_model_cached(model_name, version):
+    return load_model(model_name)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_explainer(model_name, version):
+    """TreeExplainer for a model, built once per version of the artifacts on disk"""
+    import shap
+    return shap.TreeExplainer(_load_model_cached(model_name, version))
+
+
+def _shap_contributions(model_name, model, X_scaled):
+    """
+    SHAP values of shape (n_samples, n_features) and the base value for scaled model inputs
+    
+    XGBoost computes the contributions itself (pred_contribs), which gives the same values
+    as shap.TreeExplainer without walking the forest in Python first.
+    """
+    if model_name == 'xgboost':
+        import xgboost as xgb
+        booster = model.get_booster()
+        contribs = booster.predict(xgb.DMatrix(X_scaled, feature_names=booster.feature_names), pred_contribs=True)
+        return contribs[:, :-1], float(contribs[0, -1])
+    
+    explainer = _get_explainer(model_name, _artifacts_version())
+    shap_values = explainer.shap_values(X_scaled)
+    if isinstance(shap_values, list):
+        shap_values = shap_values[1]
+    
+    base_value = explainer.expected_value
+    if isinstance(base_value, np.ndarray):
+        base_value = base_value[1]
+    return shap_values, base_value
+
+
+def explain_predictions_shap(df, model_name='xgboost'):
+    """
+    Get SHAP explanations for a batch of predictions
+    
+    Args:
+        df (pd.DataFrame): Input data with features
+        model_name (str): Model name
+        
+    Returns:
+        dict: SHAP values (DataFrame, one row per customer), base value and churn probabilities
+    """
+    version = _artifacts_version()
+    model = _load_model_cached(model_name, version)
+    encoders, scaler, feature_names = _cached_preprocessors()
+    
+    X_scaled = scale_input(preprocess_input(df, encoders, feature_names), scaler, copy=False)
+    _, probabilities = _predict_with_model(model, X_scaled)
+    
+    if model_name == 'xgboost' or model_name == 'random_forest':
+        shap_values, base_value = _shap_contributions(model_name, model, X_scaled)
+    else:
+        shap_values, base_value = np.zeros((len(X_scaled), 0)), 0.5
+    
+    return {
+        'shap_values': pd.DataFrame(shap_values, columns=feature_names[:shap_values.shape[1]], index=df.index),
+        'base_value': base_value,
+        'predictions': probabilities
+    }
+
+
 def explain_prediction_shap(customer_data, model_name='xgboost'):
     """
     Get SHAP explanation for a single prediction
@@ -233,44 +483,28 @@ def explain_prediction_shap(customer_data, model_name='xgboost'):
     Returns:
         dict: SHAP values and base value
     """
-    import shap
+    version = _artifacts_version()
+    model = _load_model_cached(model_name, version)
+    encoders, scaler, feature_names = _cached_preprocessors()
     
-    model = load_model(model_name)
-    encoders, scaler, feature_names = load_preprocessors()
+    if not isinstance(customer_data, dict):
+        customer_data = customer_data.to_dict()
     
-    if isinstance(customer_data, dict):
-        df = pd.DataFrame([customer_data])
-    else:
-        df = pd.DataFrame([customer_data.to_dict()])
-    
-    X = preprocess_input(df, encoders, feature_names)
-    
-    if scaler is not None:
-        X_scaled = scaler.transform(X)
-        X_scaled = pd.DataFrame(X_scaled, columns=X.columns, index=X.index)
-    else:
-        X_scaled = X
+    X_scaled = scale_input(customer_vector(customer_data, encoders, feature_names), scaler, copy=False)
+    prediction = float(_predict_with_model(model, X_scaled)[1][0])
     
     if model_name == 'xgboost' or model_name == 'random_forest':
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(X_scaled)
-        
-        if isinstance(shap_values, list):
-            shap_values = shap_values[1]
-        
-        if len(shap_values.shape) > 1:
-            shap_values = shap_values[0]
-        
+        shap_values, base_value = _shap_contributions(model_name, model, X_scaled)
         explanation = {
-            'shap_values': dict(zip(feature_names, shap_values)),
-            'base_value': explainer.expected_value if not isinstance(explainer.expected_value, np.ndarray) else explainer.expected_value[1],
-            'prediction': float(model.predict_proba(X_scaled)[0, 1])
+            'shap_values': dict(zip(feature_names, shap_values[0])),
+            'base_value': base_value,
+            'prediction': prediction
         }
     else:
         explanation = {
             'shap_values': {},
             'base_value': 0.5,
-            'prediction': float(model.predict_proba(X_scaled)[0, 1])
+            'prediction': prediction
         }
     
     return explanation
@@ -5,41 +5,103 @@ Trains multiple models, evaluates performance, and generates SHAP explanations
 
 import pandas as pd
 import numpy as np
-import pickle
+import joblib
+from joblib import Parallel, delayed, cpu_count
 import json
 import os
+import warnings
 from datetime import datetime
 
 # Set matplotlib backend to Agg (non-GUI) to avoid tkinter threading issues on Windows
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import seaborn as sns
 
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import cross_val_score, StratifiedKFold
 from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    roc_auc_score, average_precision_score, confusion_matrix,
-    classification_report, roc_curve, precision_recall_curve
+    roc_auc_score, average_precision_score,
+    classification_report
 )
 import xgboost as xgb
 import shap
 
-from data_prep import prepare_data_pipeline, save_preprocessors
+try:
+    import cupy
+    CUPY_AVAILABLE = True
+except ImportError:
+    CUPY_AVAILABLE = False
+
+try:
+    from sklearnex.linear_model import LogisticRegression as OneDALLogisticRegression
+    SKLEARNEX_AVAILABLE = True
+except ImportError:
+    SKLEARNEX_AVAILABLE = False
+
+from data_prep import prepare_data_pipeline, save_preprocessors, ARTIFACT_COMPRESSION
 
 ARTIFACTS_DIR = 'ml/artifacts'
 RANDOM_STATE = 42
 
+# The three models are fitted side by side, so each gets a third of the cores
+MODEL_N_JOBS = max(1, cpu_count() // 3)
+
+# Rows drawn into the SHAP beeswarm plot; importances still use the whole test set
+SHAP_PLOT_SAMPLE_SIZE = 2000
+
+# Units of each model's SHAP values: the linear and XGBoost explanations are exact in the model's
+# margin, while TreeExplainer explains the random forest's predicted probability
+SHAP_OUTPUT_SPACE = {
+    'Logistic Regression': 'log-odds',
+    'Random Forest': 'probability',
+    'XGBoost': 'log-odds'
+}
+
+
+def _detect_xgb_device():
+    """Return 'cuda' when XGBoost can train on a visible GPU, otherwise 'cpu'"""
+    if not xgb.build_info().get('USE_CUDA'):
+        return 'cpu'
+    # CUDA builds fall back to the CPU when no GPU is visible, so check which device a tiny booster got
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        booster = xgb.train({'device': 'cuda', 'tree_method': 'hist'},
+                            xgb.DMatrix(np.zeros((2, 1)), label=[0, 1]), num_boost_round=1)
+    device = json.loads(booster.save_config())['learner']['generic_param']['device']
+    return 'cuda' if device.startswith('cuda') else 'cpu'
+
+
+# Detected on first use rather than at import, since detection trains a booster. A plain module
+# global (not an lru_cache wrapper) keeps train_xgboost picklable when this file runs as a script.
+_XGB_DEVICE = None
+
+
+def _xgb_device():
+    """XGBoost training device, detected once per process"""
+    global _XGB_DEVICE
+    if _XGB_DEVICE is None:
+        _XGB_DEVICE = _detect_xgb_device()
+    return _XGB_DEVICE
+
 
 def train_logistic_regression(X_train, y_train):
     """Train Logistic Regression model"""
-    model = LogisticRegression(
+    params = dict(
         random_state=RANDOM_STATE,
         max_iter=1000,
         class_weight='balanced'
     )
+    model = LogisticRegression(**params)
+    
+    if SKLEARNEX_AVAILABLE:
+        # oneDAL runs the same lbfgs fit faster; the fitted parameters are copied onto the plain
+        # sklearn estimator so the saved model loads without sklearnex
+        fitted = OneDALLogisticRegression(**params).fit(X_train, y_train)
+        for attr in ('classes_', 'coef_', 'intercept_', 'n_iter_', 'n_features_in_'):
+            setattr(model, attr, getattr(fitted, attr))
+        return model
+    
     model.fit(X_train, y_train)
     return model
 
@@ -53,7 +115,7 @@ def train_random_forest(X_train, y_train):
         min_samples_leaf=2,
         random_state=RANDOM_STATE,
         class_weight='balanced',
-        n_jobs=-1
+        n_jobs=MODEL_N_JOBS
     )
     model.fit(X_train, y_train)
     return model
@@ -62,6 +124,7 @@ def train_random_forest(X_train, y_train):
 def train_xgboost(X_train, y_train):
     """Train XGBoost model"""
     scale_pos_weight = (y_train == 0).sum() / (y_train == 1).sum()
+    device = _xgb_device()
     
     model = xgb.XGBClassifier(
         n_estimators=100,
@@ -72,34 +135,40 @@ def train_xgboost(X_train, y_train):
         scale_pos_weight=scale_pos_weight,
         random_state=RANDOM_STATE,
         eval_metric='logloss',
-        use_label_encoder=False
+        use_label_encoder=False,
+        tree_method='hist',
+        device=device,
+        n_jobs=MODEL_N_JOBS
     )
+    if device == 'cuda' and CUPY_AVAILABLE:
+        # Copy the training data to the GPU once instead of on every boosting round
+        X_train, y_train = cupy.asarray(np.asarray(X_train)), cupy.asarray(np.asarray(y_train))
     model.fit(X_train, y_train)
     return model
 
 
-def evaluate_model(model, X_train, X_test, y_train, y_test, model_name):
+def evaluate_model(y_train, y_test, y_pred, y_pred_proba, y_train_pred_proba, model_name):
     """
     Evaluate model performance with comprehensive metrics
     
+    Takes predictions computed once by the caller, so the model is not scored again here.
+    
     Returns:
         dict: Dictionary of evaluation metrics
     """
-    y_pred = model.predict(X_test)
-    y_pred_proba = model.predict_proba(X_test)[:, 1]
-    
-    y_train_pred_proba = model.predict_proba(X_train)[:, 1]
+    # One pass over the labels gives the confusion matrix; the threshold metrics follow from it
+    tn, fp, fn, tp = np.bincount(2 * np.asarray(y_test, dtype=np.int64) + y_pred, minlength=4).tolist()
     
     metrics = {
         'model_name': model_name,
-        'accuracy': accuracy_score(y_test, y_pred),
-        'precision': precision_score(y_test, y_pred),
-        'recall': recall_score(y_test, y_pred),
-        'f1_score': f1_score(y_test, y_pred),
+        'accuracy': (tp + tn) / (tp + tn + fp + fn),
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'f1_score': 2 * tp / (2 * tp + fp + fn) if tp else 0.0,
         'roc_auc': roc_auc_score(y_test, y_pred_proba),
         'pr_auc': average_precision_score(y_test, y_pred_proba),
         'train_roc_auc': roc_auc_score(y_train, y_train_pred_proba),
-        'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
+        'confusion_matrix': [[tn, fp], [fn, tp]],
     }
     
     metrics['overfit_gap'] = metrics['train_roc_auc'] - metrics['roc_auc']
@@ -117,15 +186,47 @@ def evaluate_model(model, X_train, X_test, y_train, y_test, model_name):
     return metrics
 
 
-def cross_validate_model(model, X, y, cv=5, scoring='roc_auc'):
+def _cross_validate_xgboost(model, X, y, folds):
+    """
+    ROC-AUC per fold for an XGBoost model, trained with xgb.train on slices of one DMatrix
+    
+    Equivalent to cross_val_score on the sklearn wrapper, without converting the data again
+    for every fold.
+    """
+    params = model.get_xgb_params()
+    dtrain = xgb.DMatrix(X, label=y)
+    y = np.asarray(y)
+    
+    scores = []
+    for train_idx, test_idx in folds:
+        booster = xgb.train(params, dtrain.slice(train_idx), num_boost_round=model.n_estimators)
+        scores.append(roc_auc_score(y[test_idx], booster.predict(dtrain.slice(test_idx))))
+    
+    return np.array(scores)
+
+
+def stratified_folds(y, cv=5):
+    """Stratified (train_idx, test_idx) pairs, computed once and shared by every model's cross-validation"""
+    skf = StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE)
+    return list(skf.split(np.zeros(len(y)), y))
+
+
+def cross_validate_model(model, X, y, cv=5, scoring='roc_auc', folds=None):
     """
     Perform cross-validation
     
+    Args:
+        folds (list): Precomputed (train_idx, test_idx) pairs from stratified_folds; built from cv if omitted
+    
     Returns:
         dict: Cross-validation scores
     """
-    skf = StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE)
-    scores = cross_val_score(model, X, y, cv=skf, scoring=scoring, n_jobs=-1)
+    if folds is None:
+        folds = stratified_folds(y, cv)
+    if isinstance(model, xgb.XGBModel) and scoring == 'roc_auc':
+        scores = _cross_validate_xgboost(model, X, y, folds)
+    else:
+        scores = cross_val_score(model, X, y, cv=folds, scoring=scoring, n_jobs=-1)
     
     cv_results = {
         'cv_scores': scores.tolist(),
@@ -149,82 +250,124 @@ def generate_classification_report(y_test, y_pred, output_path=None):
     return report
 
 
-def plot_confusion_matrix(cm, model_name, output_path=None):
-    """Plot and save confusion matrix"""
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=['Not Churned', 'Churned'],
-                yticklabels=['Not Churned', 'Churned'])
-    plt.title(f'Confusion Matrix - {model_name}')
-    plt.ylabel('True Label')
-    plt.xlabel('Predicted Label')
-    plt.tight_layout()
+def _draw_confusion_matrix(ax, cm, model_name):
+    """Draw the confusion matrix on ax"""
+    labels = ['Not Churned', 'Churned']
+    image = ax.imshow(cm, cmap='Blues')
+    ax.figure.colorbar(image, ax=ax)
+    # White text on the darker half of the colour scale, as seaborn's annotations do
+    threshold = (cm.max() + cm.min()) / 2
+    for (i, j), value in np.ndenumerate(cm):
+        ax.text(j, i, str(value), ha='center', va='center',
+                color='white' if value > threshold else 'black')
+    ax.set_xticks(range(len(labels)), labels)
+    ax.set_yticks(range(len(labels)), labels)
+    ax.set_title(f'Confusion Matrix - {model_name}')
+    ax.set_ylabel('True Label')
+    ax.set_xlabel('Predicted Label')
+
+
+def _ranking_curves(y_test, y_pred_proba):
+    """
+    ROC and Precision-Recall curves with their areas from a single sort of the scores
     
-    if output_path:
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"Confusion matrix saved to {output_path}")
+    Same points and areas as roc_curve/precision_recall_curve (without dropping intermediate
+    ROC points), which would each sort the scores again.
     
-    plt.close()
-
-
-def plot_roc_curve(y_test, y_pred_proba, model_name, output_path=None):
-    """Plot and save ROC curve"""
-    fpr, tpr, thresholds = roc_curve(y_test, y_pred_proba)
-    auc = roc_auc_score(y_test, y_pred_proba)
+    Returns:
+        dict: fpr, tpr, precision, recall arrays and roc_auc, pr_auc
+    """
+    order = np.argsort(y_pred_proba, kind='mergesort')[::-1]
+    scores = np.asarray(y_pred_proba)[order]
+    labels = np.asarray(y_test)[order]
     
-    plt.figure(figsize=(8, 6))
-    plt.plot(fpr, tpr, label=f'{model_name} (AUC = {auc:.4f})', linewidth=2)
-    plt.plot([0, 1], [0, 1], 'k--', label='Random Classifier')
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title(f'ROC Curve - {model_name}')
-    plt.legend()
-    plt.grid(alpha=0.3)
-    plt.tight_layout()
+    # Cumulative true/false positives at each distinct threshold, highest score first
+    threshold_idx = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tps = np.cumsum(labels, dtype=np.float64)[threshold_idx]
+    fps = 1 + threshold_idx - tps
     
-    if output_path:
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"ROC curve saved to {output_path}")
+    fpr = np.r_[0, fps] / fps[-1]
+    tpr = np.r_[0, tps] / tps[-1]
+    precision = tps / (tps + fps)
+    recall = tps / tps[-1]
     
-    plt.close()
+    return {
+        'fpr': fpr,
+        'tpr': tpr,
+        'precision': np.r_[precision[::-1], 1],
+        'recall': np.r_[recall[::-1], 0],
+        'roc_auc': np.trapz(tpr, fpr),
+        'pr_auc': np.sum(np.diff(np.r_[0, recall]) * precision),
+    }
 
 
-def plot_precision_recall_curve(y_test, y_pred_proba, model_name, output_path=None):
-    """Plot and save Precision-Recall curve"""
-    precision, recall, thresholds = precision_recall_curve(y_test, y_pred_proba)
-    pr_auc = average_precision_score(y_test, y_pred_proba)
+def _draw_roc_curve(ax, curves, model_name):
+    """Draw the ROC curve on ax"""
+    fpr, tpr, auc = curves['fpr'], curves['tpr'], curves['roc_auc']
     
-    plt.figure(figsize=(8, 6))
-    plt.plot(recall, precision, label=f'{model_name} (PR-AUC = {pr_auc:.4f})', linewidth=2)
-    plt.xlabel('Recall')
-    plt.ylabel('Precision')
-    plt.title(f'Precision-Recall Curve - {model_name}')
-    plt.legend()
-    plt.grid(alpha=0.3)
-    plt.tight_layout()
+    ax.plot(fpr, tpr, label=f'{model_name} (AUC = {auc:.4f})', linewidth=2)
+    ax.plot([0, 1], [0, 1], 'k--', label='Random Classifier')
+    ax.set_xlabel('False Positive Rate')
+    ax.set_ylabel('True Positive Rate')
+    ax.set_title(f'ROC Curve - {model_name}')
+    ax.legend()
+    ax.grid(alpha=0.3)
+
+
+def _draw_precision_recall_curve(ax, curves, model_name):
+    """Draw the Precision-Recall curve on ax"""
+    precision, recall, pr_auc = curves['precision'], curves['recall'], curves['pr_auc']
+    
+    ax.plot(recall, precision, label=f'{model_name} (PR-AUC = {pr_auc:.4f})', linewidth=2)
+    ax.set_xlabel('Recall')
+    ax.set_ylabel('Precision')
+    ax.set_title(f'Precision-Recall Curve - {model_name}')
+    ax.legend()
+    ax.grid(alpha=0.3)
+
+
+def plot_model_diagnostics(y_test, y_pred_proba, cm, model_name, output_path=None):
+    """Plot confusion matrix, ROC and Precision-Recall curves side by side and save them as one image"""
+    fig, axes = plt.subplots(1, 3, figsize=(24, 6))
+    _draw_confusion_matrix(axes[0], cm, model_name)
+    curves = _ranking_curves(y_test, y_pred_proba)
+    _draw_roc_curve(axes[1], curves, model_name)
+    _draw_precision_recall_curve(axes[2], curves, model_name)
+    fig.tight_layout()
     
     if output_path:
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"PR curve saved to {output_path}")
+        fig.savefig(output_path, dpi=150, bbox_inches='tight')
+        print(f"Model diagnostics saved to {output_path}")
     
-    plt.close()
+    plt.close(fig)
+
 
+def model_output_dir(model_name):
+    """Artifact directory for a model, e.g. 'Random Forest' -> ml/artifacts/random_forest"""
+    return f"{ARTIFACTS_DIR}/{model_name.lower().replace(' ', '_')}"
 
-def generate_shap_analysis(model, X_train, X_test, feature_names, model_name, max_display=20):
+
+def generate_shap_analysis(model, X_train, X_test, feature_names, model_name, max_display=20, output_dir=None):
     """
     Generate SHAP analysis for model explainability
     
+    output_dir defaults to the model's artifact directory, which is created if needed.
+    
+    The values are in the units given by SHAP_OUTPUT_SPACE, which the plot titles and the saved
+    shap_values.pkl record.
+    
     Returns:
-        tuple: (shap_values, explainer)
+        tuple: (shap_values, explainer, feature_importance); explainer is None for XGBoost
     """
     print(f"\nGenerating SHAP analysis for {model_name}...")
     
     if model_name == 'XGBoost':
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(X_test)
-        # For binary classification, XGBoost returns values for positive class
-        if isinstance(shap_values, list):
-            shap_values = shap_values[1]
+        # The booster computes TreeSHAP natively (on the GPU when trained there); the last
+        # column is the bias term
+        explainer = None
+        booster = model.get_booster()
+        contribs = booster.predict(xgb.DMatrix(X_test, feature_names=booster.feature_names), pred_contribs=True)
+        shap_values = contribs[:, :-1]
     elif model_name == 'Random Forest':
         explainer = shap.TreeExplainer(model)
         shap_values = explainer.shap_values(X_test)
@@ -232,16 +375,18 @@ def generate_shap_analysis(model, X_train, X_test, feature_names, model_name, ma
         if isinstance(shap_values, list):
             shap_values = shap_values[1]
     else:
-        # Logistic Regression - use smaller sample for KernelExplainer
-        sample_size = min(100, len(X_train))
-        X_train_sample = shap.sample(X_train, sample_size, random_state=RANDOM_STATE)
-        explainer = shap.KernelExplainer(model.predict_proba, X_train_sample)
-        # Only explain first 100 test samples for speed
-        shap_values = explainer.shap_values(X_test[:100])
+        # Logistic Regression - SHAP values of a linear model are exact in closed form
+        # (coefficient times distance from the training mean), so the whole test set is explained.
+        # The masker only holds the training moments, so the pickled explainer stays small.
+        X_train = np.asarray(X_train)
+        masker = shap.maskers.Independent({
+            'mean': X_train.mean(axis=0, dtype=np.float64),
+            'cov': np.cov(X_train, rowvar=False)
+        })
+        explainer = shap.LinearExplainer(model, masker)
+        shap_values = explainer.shap_values(X_test)
         if isinstance(shap_values, list):
             shap_values = shap_values[1]
-        # Trim X_test to match
-        X_test = X_test[:100]
     
     # Ensure SHAP values are 2D array
     if len(shap_values.shape) == 1:
@@ -253,54 +398,69 @@ def generate_shap_analysis(model, X_train, X_test, feature_names, model_name, ma
     
     if shap_values.shape[0] != X_test.shape[0]:
         print(f"WARNING: Shape mismatch! Trimming X_test to match SHAP values")
-        X_test = X_test.iloc[:shap_values.shape[0]]
+        X_test = X_test[:shap_values.shape[0]]
     
-    shap_values_df = pd.DataFrame(shap_values, columns=feature_names)
     feature_importance = pd.DataFrame({
         'feature': feature_names,
         'importance': np.abs(shap_values).mean(axis=0)
     }).sort_values('importance', ascending=False)
     
     print("\nTop 10 Most Important Features (SHAP):")
-    for idx, row in feature_importance.head(10).iterrows():
-        print(f"  {row['feature']}: {row['importance']:.4f}")
+    top_10 = feature_importance.head(10)
+    for feature, importance in zip(top_10['feature'], top_10['importance']):
+        print(f"  {feature}: {importance:.4f}")
     
-    output_dir = f"{ARTIFACTS_DIR}/{model_name.lower().replace(' ', '_')}"
-    os.makedirs(output_dir, exist_ok=True)
+    if output_dir is None:
+        output_dir = model_output_dir(model_name)
+        os.makedirs(output_dir, exist_ok=True)
+    
+    output_space = SHAP_OUTPUT_SPACE[model_name]
+    
+    # A fixed, seeded subset keeps the beeswarm readable and fast to draw on large test sets
+    X_test = np.asarray(X_test)
+    n_plot = min(SHAP_PLOT_SAMPLE_SIZE, len(X_test))
+    plot_idx = np.sort(np.random.default_rng(RANDOM_STATE).choice(len(X_test), n_plot, replace=False))
     
     plt.figure(figsize=(10, 8))
-    shap.summary_plot(shap_values, X_test.values, feature_names=feature_names, 
+    shap.summary_plot(shap_values[plot_idx], X_test[plot_idx], feature_names=feature_names, 
                       max_display=max_display, show=False)
+    plt.title(f"{model_name} SHAP values ({output_space})")
     plt.tight_layout()
-    plt.savefig(f"{output_dir}/shap_summary_plot.png", dpi=300, bbox_inches='tight')
+    plt.savefig(f"{output_dir}/shap_summary_plot.png", dpi=150, bbox_inches='tight')
     print(f"SHAP summary plot saved to {output_dir}/shap_summary_plot.png")
     plt.close()
     
     plt.figure(figsize=(10, 8))
-    shap.summary_plot(shap_values, X_test.values, feature_names=feature_names, 
+    shap.summary_plot(shap_values, X_test, feature_names=feature_names, 
                       plot_type='bar', max_display=max_display, show=False)
+    plt.title(f"{model_name} mean |SHAP value| ({output_space})")
     plt.tight_layout()
-    plt.savefig(f"{output_dir}/shap_feature_importance.png", dpi=300, bbox_inches='tight')
+    plt.savefig(f"{output_dir}/shap_feature_importance.png", dpi=150, bbox_inches='tight')
     print(f"SHAP feature importance saved to {output_dir}/shap_feature_importance.png")
     plt.close()
     
     feature_importance.to_csv(f"{output_dir}/feature_importance.csv", index=False)
     
-    with open(f"{output_dir}/shap_values.pkl", 'wb') as f:
-        pickle.dump({'shap_values': shap_values, 'explainer': explainer}, f)
+    joblib.dump({'shap_values': shap_values, 'explainer': explainer, 'output_space': output_space},
+                f"{output_dir}/shap_values.pkl", compress=ARTIFACT_COMPRESSION)
     
     return shap_values, explainer, feature_importance
 
 
-def save_model(model, model_name, metrics, feature_importance=None):
-    """Save trained model and associated artifacts"""
-    output_dir = f"{ARTIFACTS_DIR}/{model_name.lower().replace(' ', '_')}"
-    os.makedirs(output_dir, exist_ok=True)
+def save_model(model, model_name, metrics, feature_importance=None, output_dir=None):
+    """Save trained model and associated artifacts (output_dir as in generate_shap_analysis)"""
+    if output_dir is None:
+        output_dir = model_output_dir(model_name)
+        os.makedirs(output_dir, exist_ok=True)
     
-    with open(f"{output_dir}/model.pkl", 'wb') as f:
-        pickle.dump(model, f)
+    joblib.dump(model, f"{output_dir}/model.pkl", compress=ARTIFACT_COMPRESSION)
     print(f"Model saved to {output_dir}/model.pkl")
     
+    if isinstance(model, xgb.XGBModel):
+        # XGBoost's native binary format loads much faster than the pickled sklearn wrapper
+        model.save_model(f"{output_dir}/model.ubj")
+        print(f"Model saved to {output_dir}/model.ubj")
+    
     with open(f"{output_dir}/metrics.json", 'w') as f:
         json.dump(metrics, f, indent=2)
     print(f"Metrics saved to {output_dir}/metrics.json")
@@ -356,7 +516,8 @@ def train_pipeline(data_source='csv', credentials=None, csv_path=None):
         csv_path=csv_path,
         test_size=0.2,
         random_state=RANDOM_STATE,
-        scale=True
+        scale=True,
+        return_numpy=True
     )
     
     X_train = data['X_train']
@@ -371,41 +532,48 @@ def train_pipeline(data_source='csv', credentials=None, csv_path=None):
     print("STEP 2: MODEL TRAINING")
     print("="*80)
     
-    models = {
-        'Logistic Regression': train_logistic_regression(X_train, y_train),
-        'Random Forest': train_random_forest(X_train, y_train),
-        'XGBoost': train_xgboost(X_train, y_train)
+    trainers = {
+        'Logistic Regression': train_logistic_regression,
+        'Random Forest': train_random_forest,
+        'XGBoost': train_xgboost
     }
+    # The models are independent, so wall time is the slowest fit rather than the sum
+    fitted = Parallel(n_jobs=len(trainers), backend='loky')(
+        delayed(train)(X_train, y_train) for train in trainers.values()
+    )
+    models = dict(zip(trainers, fitted))
+    
+    model_dirs = {model_name: model_output_dir(model_name) for model_name in models}
+    for output_dir in model_dirs.values():
+        os.makedirs(output_dir, exist_ok=True)
     
     print("\n" + "="*80)
     print("STEP 3: MODEL EVALUATION")
     print("="*80)
     
     all_metrics = []
+    folds = stratified_folds(y_train, cv=5)
     
     for model_name, model in models.items():
         print(f"\nEvaluating {model_name}...")
         
-        metrics = evaluate_model(model, X_train, X_test, y_train, y_test, model_name)
+        # Score each split once and threshold the classes from the probabilities
+        y_pred_proba = model.predict_proba(X_test)[:, 1]
+        y_train_pred_proba = model.predict_proba(X_train)[:, 1]
+        y_pred = (y_pred_proba > 0.5).astype(np.int8)
+        
+        metrics = evaluate_model(y_train, y_test, y_pred, y_pred_proba, y_train_pred_proba, model_name)
         
-        cv_results = cross_validate_model(model, X_train, y_train, cv=5, scoring='roc_auc')
+        cv_results = cross_validate_model(model, X_train, y_train, scoring='roc_auc', folds=folds)
         metrics.update(cv_results)
         
-        y_pred = model.predict(X_test)
-        y_pred_proba = model.predict_proba(X_test)[:, 1]
-        
-        output_dir = f"{ARTIFACTS_DIR}/{model_name.lower().replace(' ', '_')}"
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = model_dirs[model_name]
         
         report = generate_classification_report(y_test, y_pred, 
                                                 f"{output_dir}/classification_report.json")
         
-        plot_confusion_matrix(np.array(metrics['confusion_matrix']), model_name,
-                            f"{output_dir}/confusion_matrix.png")
-        plot_roc_curve(y_test, y_pred_proba, model_name,
-                      f"{output_dir}/roc_curve.png")
-        plot_precision_recall_curve(y_test, y_pred_proba, model_name,
-                                   f"{output_dir}/pr_curve.png")
+        plot_model_diagnostics(y_test, y_pred_proba, np.array(metrics['confusion_matrix']), model_name,
+                               f"{output_dir}/diagnostics.png")
         
         all_metrics.append(metrics)
     
@@ -415,12 +583,12 @@ def train_pipeline(data_source='csv', credentials=None, csv_path=None):
     
     for model_name, model in models.items():
         shap_values, explainer, feature_importance = generate_shap_analysis(
-            model, X_train, X_test, feature_names, model_name
+            model, X_train, X_test, feature_names, model_name, output_dir=model_dirs[model_name]
         )
         
         save_model(model, model_name, 
                   [m for m in all_metrics if m['model_name'] == model_name][0],
-                  feature_importance)
+                  feature_importance, output_dir=model_dirs[model_name])
     
     print("\n" + "="*80)
     print("STEP 5: MODEL COMPARISON")
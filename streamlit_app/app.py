@@ -5,20 +5,27 @@ An editorial-style analytics dashboard for customer lifecycle optimization and c
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import snowflake.connector
 from datetime import datetime
 import os
+import re
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+# st.fragment is newer than the pinned Streamlit 1.31; there the decorated sections
+# just run as part of the full script
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
 try:
     from ml.predict import (
         load_best_model, load_model_metrics, load_feature_importance,
-        get_model_comparison, predict_churn, explain_prediction_shap
+        get_model_comparison, predict_churn, explain_prediction_shap, _artifacts_version
     )
     ML_AVAILABLE = True
 except ImportError:
@@ -352,6 +359,9 @@ h2 {
 </style>
 """
 
+# The stylesheet is re-sent on every rerun, so collapse its whitespace once at import
+CUSTOM_CSS = re.sub(r'\s*([{};])\s*', r'\1', re.sub(r'\s+', ' ', CUSTOM_CSS)).strip()
+
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 @st.cache_resource
@@ -365,7 +375,11 @@ def get_snowflake_connection():
             warehouse=st.secrets["snowflake"]["warehouse"],
             database=st.secrets["snowflake"]["database"],
             schema=st.secrets["snowflake"]["schema"],
-            insecure_mode=True
+            insecure_mode=True,
+            # The connection is cached across reruns, so keep the session from expiring when idle
+            client_session_keep_alive=True,
+            # More threads download result chunks in parallel before fetch_pandas_all assembles them
+            client_prefetch_threads=8
         )
         return conn
     except Exception as e:
@@ -373,41 +387,116 @@ def get_snowflake_connection():
         st.markdown("Configure credentials in `.streamlit/secrets.toml`")
         return None
 
-@st.cache_data(ttl=600)
-def load_data(_conn):
-    """Load churn features data from Snowflake."""
-    query = "SELECT * FROM CHURN_ANALYTICS.ANALYTICS.churn_features"
-    df = pd.read_sql(query, _conn)
+FEATURES_TABLE = "CHURN_ANALYTICS.ANALYTICS.churn_features"
+
+def build_filter_clause(filters, conditions=()):
+    """
+    Translate the sidebar selections into a SQL WHERE clause and its bound parameters.
+    Any extra conditions are ANDed with the filters.
+    """
+    segment, contract_type, age_group, churn_status = filters
+    conditions, params = list(conditions), {}
+    
+    for column, value in [('segment', segment), ('contract_type', contract_type), ('age_group', age_group)]:
+        if value != 'All':
+            conditions.append(f"{column} = %({column})s")
+            params[column] = value
     
-    if df.empty:
-        raise ValueError("No data returned from churn_features table")
+    if churn_status == 'Active Only':
+        conditions.append("churn_flag = 0")
+    elif churn_status == 'Churned Only':
+        conditions.append("churn_flag = 1")
     
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+ALL_FILTERS = ('All', 'All', 'All', 'All')
+
+def run_query(conn, query, params=None):
+    """
+    Execute a query and return the result as a DataFrame with lower-case column names.
+    The result is fetched as Arrow batches straight into the DataFrame instead of row by row.
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        df = cur.fetch_pandas_all()
     df.columns = df.columns.str.lower()
+    return df
+
+@st.cache_data(ttl=60)
+def load_data_version(_conn):
+    """
+    Commit time of the last change to the features table. The cached loaders take it as
+    a key argument, so a dbt run invalidates them without waiting for their TTL.
+    """
+    version = run_query(_conn, f"SELECT SYSTEM$LAST_CHANGE_COMMIT_TIME('{FEATURES_TABLE}') AS data_version")
+    return int(version['data_version'].iloc[0])
+
+@st.cache_data(ttl=600)
+def load_chart_aggregates(_conn, filters, data_version):
+    """
+    Group the filtered customers in Snowflake, returning only the small per-chart aggregates.
+    All three groupings come back from a single query over the filtered rows.
+    """
+    where, params = build_filter_clause(filters)
     
-    required_columns = ['cohort_month', 'signup_date', 'customer_id', 'churn_flag', 
-                       'churn_risk_score', 'estimated_lifetime_value', 'segment', 
-                       'contract_type', 'age_group', 'rfm_segment']
+    aggregates = run_query(_conn, f"""
+        WITH filtered AS (
+            SELECT cohort_month, contract_type, rfm_segment, churn_flag
+            FROM {FEATURES_TABLE} {where}
+        )
+        SELECT 'cohort' AS chart, TO_CHAR(cohort_month, 'YYYY-MM') AS label,
+               COUNT(*) AS customers, SUM(churn_flag) AS churned
+        FROM filtered GROUP BY label
+        UNION ALL
+        SELECT 'contract', contract_type, COUNT(*), SUM(churn_flag)
+        FROM filtered GROUP BY contract_type
+        UNION ALL
+        SELECT 'segment', rfm_segment, COUNT(*), SUM(churn_flag)
+        FROM filtered GROUP BY rfm_segment
+    """, params)
     
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        raise ValueError(f"Missing required columns: {missing_columns}. Available columns: {list(df.columns)}")
+    def chart_rows(chart):
+        return aggregates.loc[aggregates['chart'] == chart, ['label', 'customers', 'churned']]
     
-    df['cohort_month'] = pd.to_datetime(df['cohort_month'])
-    df['signup_date'] = pd.to_datetime(df['signup_date'])
-    if 'last_transaction_date' in df.columns:
-        df['last_transaction_date'] = pd.to_datetime(df['last_transaction_date'])
-    if 'last_payment_date' in df.columns:
-        df['last_payment_date'] = pd.to_datetime(df['last_payment_date'])
+    cohort_data = (chart_rows('cohort').rename(columns={'label': 'cohort_label'})
+                   .sort_values('cohort_label', ignore_index=True))
+    contract_data = (chart_rows('contract').rename(columns={'label': 'contract_type'})
+                     .sort_values('contract_type', ignore_index=True))
+    segment_data = (chart_rows('segment').rename(columns={'label': 'segment', 'customers': 'count'})
+                    [['segment', 'count']].sort_values('count', ignore_index=True))
     
-    return df
+    return cohort_data, contract_data, segment_data
+
+@st.cache_data(ttl=600)
+def load_dimensions(_conn, data_version):
+    """Distinct segment, contract type and age group values for the sidebar selectors."""
+    dims = run_query(_conn, f"SELECT DISTINCT segment, contract_type, age_group FROM {FEATURES_TABLE}")
+    return {col: sorted(dims[col].dropna().unique().tolist()) for col in dims.columns}
+
+@st.cache_data(ttl=600)
+def load_kpis(_conn, filters, data_version):
+    """Headline KPIs and financial impact totals for the filtered customers, in one Snowflake scan."""
+    where, params = build_filter_clause(filters)
+    kpis = run_query(_conn, f"""
+        SELECT COUNT(*) AS total_customers,
+               COALESCE(SUM(churn_flag), 0) AS churned_customers,
+               AVG(estimated_lifetime_value) AS avg_ltv,
+               COUNT_IF(churn_risk_score >= 65) AS at_risk_customers,
+               COALESCE(SUM(estimated_lifetime_value), 0) AS total_ltv,
+               COALESCE(SUM(IFF(churn_risk_score >= 65, estimated_lifetime_value, 0)), 0) AS at_risk_ltv,
+               COALESCE(SUM(IFF(churn_flag = 1, estimated_lifetime_value, 0)), 0) AS churned_ltv
+        FROM {FEATURES_TABLE} {where}
+    """, params)
+    return kpis.iloc[0].to_dict()
 
-def create_kpi_cards(df):
+def create_kpi_cards(kpis):
     """Create KPI metrics cards."""
-    total_customers = len(df)
-    churned_customers = df['churn_flag'].sum()
+    total_customers = int(kpis['total_customers'])
+    churned_customers = int(kpis['churned_customers'])
     churn_rate = (churned_customers / total_customers * 100) if total_customers > 0 else 0
-    avg_ltv = df['estimated_lifetime_value'].mean()
-    at_risk_customers = len(df[df['churn_risk_score'] >= 65])
+    avg_ltv = kpis['avg_ltv']
+    at_risk_customers = int(kpis['at_risk_customers'])
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -437,27 +526,24 @@ def create_kpi_cards(df):
         st.metric(
             label="At-Risk Customers",
             value=f"{at_risk_customers:,}",
-            delta=f"{at_risk_customers/total_customers*100:.1f}% of total",
+            delta=f"{(at_risk_customers / total_customers * 100) if total_customers > 0 else 0:.1f}% of total",
             delta_color="inverse"
         )
 
-def create_cohort_chart(df):
-    """Create churn rate by cohort line chart."""
-    cohort_data = df.groupby('cohort_month').agg({
-        'customer_id': 'count',
-        'churn_flag': 'sum'
-    }).reset_index()
-    
-    cohort_data['churn_rate'] = (cohort_data['churn_flag'] / cohort_data['customer_id'] * 100)
-    cohort_data['cohort_month'] = cohort_data['cohort_month'].dt.strftime('%Y-%m')
+# Chart builders are cached on their small input frames, so reruns with unchanged filters
+# reuse the finished figure instead of rebuilding it
+@st.cache_data(ttl=600, max_entries=64)
+def create_cohort_chart(cohort_data):
+    """Create churn rate by cohort line chart from per-cohort customer and churn counts."""
+    cohort_data = cohort_data.assign(churn_rate=cohort_data['churned'] / cohort_data['customers'] * 100)
     
     fig = px.line(
         cohort_data,
-        x='cohort_month',
+        x='cohort_label',
         y='churn_rate',
         markers=True,
         title='Cohort Churn Analysis',
-        labels={'cohort_month': 'Cohort Period', 'churn_rate': 'Churn Rate (%)'}
+        labels={'cohort_label': 'Cohort Period', 'churn_rate': 'Churn Rate (%)'}
     )
     
     fig.update_layout(
@@ -489,25 +575,67 @@ def create_cohort_chart(df):
     
     return fig
 
-def create_rfm_scatter(df):
-    """Create RFM scatter plot."""
-    sample_df = df.sample(n=min(1000, len(df)), random_state=42)
-    
-    fig = px.scatter(
-        sample_df,
-        x='recency_days',
-        y='monetary',
-        size='frequency',
-        color='churn_flag',
-        hover_data=['first_name', 'last_name', 'rfm_segment', 'churn_risk_score'],
+RFM_SCATTER_COLUMNS = ['recency_days', 'monetary', 'frequency', 'churn_flag',
+                       'first_name', 'last_name', 'rfm_segment', 'churn_risk_score']
+
+@st.cache_data(ttl=600)
+def sample_rfm_points(_conn, filters, data_version, n=1000):
+    """
+    Draw the scatter sample in Snowflake, stratified on churn_flag and rfm_segment so that
+    churned customers and small segments keep their share of the points.
+    """
+    where, params = build_filter_clause(filters)
+    params['sample_size'] = n
+    
+    # Each stratum keeps its proportional quota of rows, picked by a stable hash of the customer id
+    return run_query(_conn, f"""
+        SELECT {', '.join(RFM_SCATTER_COLUMNS)}
+        FROM {FEATURES_TABLE} {where}
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY churn_flag, rfm_segment ORDER BY HASH(customer_id))
+                <= ROUND(COUNT(*) OVER (PARTITION BY churn_flag, rfm_segment)
+                         * LEAST(1, %(sample_size)s / COUNT(*) OVER ()))
+    """, params)
+
+@st.cache_data(ttl=600, max_entries=64)
+def create_rfm_scatter(sample_df):
+    """Create RFM scatter plot from the sampled customers."""
+    frequency = sample_df['frequency'].to_numpy()
+    sizeref = 2.0 * frequency.max() / 20 ** 2 if len(frequency) else 1.0
+    
+    # One WebGL trace per status, built straight from the column arrays
+    traces = []
+    for flag, color in ((0, '#00d9a3'), (1, '#ff4757')):
+        points = sample_df[sample_df['churn_flag'].to_numpy() == flag]
+        traces.append(go.Scattergl(
+            x=points['recency_days'].to_numpy(),
+            y=points['monetary'].to_numpy(),
+            mode='markers',
+            name=str(flag),
+            marker=dict(
+                size=points['frequency'].to_numpy(),
+                sizemode='area',
+                sizeref=sizeref,
+                color=color
+            ),
+            customdata=points[['first_name', 'last_name', 'rfm_segment', 'churn_risk_score']].to_numpy(),
+            hovertemplate=(
+                f'Status={flag}<br>'
+                'Days Since Last Transaction=%{x}<br>'
+                'Total Value ($)=%{y}<br>'
+                'Transaction Count=%{marker.size}<br>'
+                'Customer=%{customdata[0]} %{customdata[1]}<br>'
+                'Segment=%{customdata[2]}<br>'
+                'Risk Score=%{customdata[3]}'
+                '<extra></extra>'
+            )
+        ))
+    
+    fig = go.Figure(data=traces)
+    fig.update_layout(
         title='RFM Customer Positioning',
-        labels={
-            'recency_days': 'Days Since Last Transaction',
-            'monetary': 'Total Value ($)',
-            'frequency': 'Transaction Count',
-            'churn_flag': 'Status'
-        },
-        color_discrete_map={0: '#00d9a3', 1: '#ff4757'}
+        xaxis_title='Days Since Last Transaction',
+        yaxis_title='Total Value ($)',
+        legend_title_text='Status'
     )
     
     fig.update_layout(
@@ -530,11 +658,9 @@ def create_rfm_scatter(df):
     
     return fig
 
-def create_segment_distribution(df):
-    """Create RFM segment distribution chart."""
-    segment_data = df['rfm_segment'].value_counts().reset_index()
-    segment_data.columns = ['segment', 'count']
-    segment_data = segment_data.sort_values('count', ascending=True)
+@st.cache_data(ttl=600, max_entries=64)
+def create_segment_distribution(segment_data):
+    """Create RFM segment distribution chart from per-segment counts (ascending)."""
     
     fig = px.bar(
         segment_data,
@@ -574,17 +700,13 @@ def create_segment_distribution(df):
     
     return fig
 
-def create_churn_by_contract(df):
-    """Create churn rate by contract type chart."""
-    contract_data = df.groupby('contract_type').agg({
-        'customer_id': 'count',
-        'churn_flag': 'sum'
-    }).reset_index()
+@st.cache_data(ttl=600, max_entries=64)
+def create_churn_by_contract(contract_data):
+    """Create churn rate by contract type chart from per-contract customer and churn counts."""
+    contract_data = contract_data.assign(churn_rate=contract_data['churned'] / contract_data['customers'] * 100)
     
-    contract_data['churn_rate'] = (contract_data['churn_flag'] / contract_data['customer_id'] * 100)
-    
-    colors = ['#ff6b35' if rate == contract_data['churn_rate'].max() 
-              else 'rgba(255, 107, 53, 0.5)' for rate in contract_data['churn_rate']]
+    rates = contract_data['churn_rate'].to_numpy()
+    colors = np.where(rates == rates.max(), '#ff6b35', 'rgba(255, 107, 53, 0.5)').tolist() if len(rates) else []
     
     fig = go.Figure(data=[
         go.Bar(
@@ -619,46 +741,54 @@ def create_churn_by_contract(df):
     
     return fig
 
-def display_at_risk_table(df):
-    """Display at-risk customers table."""
-    at_risk_df = df[df['churn_risk_score'] >= 65].sort_values('churn_risk_score', ascending=False)
-    
-    display_columns = [
-        'first_name', 'last_name', 'email', 'churn_risk_score',
-        'rfm_segment', 'monetary', 'frequency', 'recency_days',
-        'recommended_action'
-    ]
-    
-    available_columns = [col for col in display_columns if col in at_risk_df.columns]
+AT_RISK_COLUMNS = [
+    'first_name', 'last_name', 'email', 'churn_risk_score',
+    'rfm_segment', 'monetary', 'frequency', 'recency_days',
+    'recommended_action'
+]
+
+@st.cache_data(ttl=600)
+def top_at_risk_customers(_conn, filters, data_version, n=50):
+    """
+    Highest-risk customers (score >= 65) for the current filter selection, as an Arrow
+    table so st.dataframe can render cache hits without re-encoding the frame.
+    """
+    where, params = build_filter_clause(filters, conditions=['churn_risk_score >= 65'])
+    params['limit'] = n
     
+    at_risk_df = run_query(_conn, f"""
+        SELECT {', '.join(AT_RISK_COLUMNS)}
+        FROM {FEATURES_TABLE} {where}
+        ORDER BY churn_risk_score DESC
+        LIMIT %(limit)s
+    """, params)
+    return pa.Table.from_pandas(at_risk_df, preserve_index=False)
+
+def display_at_risk_table(conn, filters, data_version):
+    """Display at-risk customers table."""
     st.dataframe(
-        at_risk_df[available_columns].head(50),
+        top_at_risk_customers(conn, filters, data_version),
         use_container_width=True,
         hide_index=True
     )
 
-def create_model_comparison_chart():
+# The ML charts only change when models are retrained, so they are keyed on the artifacts version
+# (the mtime of best_model_name.txt) the same way the Snowflake loaders are keyed on the data version.
+# Missing artifacts are reported by the callers, so a warning is never served from the cache.
+@st.cache_data(ttl=600, show_spinner=False)
+def create_model_comparison_chart(_comparison, artifacts_version):
     """Create model comparison chart from saved metrics."""
-    if not ML_AVAILABLE:
-        st.warning("ML models not available. Train models first.")
-        return None
-    
-    comparison = get_model_comparison()
-    if comparison is None:
-        st.warning("No model comparison data found. Train models using ml/train_model.py")
-        return None
-    
     metrics_to_plot = ['accuracy', 'precision', 'recall', 'f1_score', 'roc_auc', 'pr_auc']
     
     fig = go.Figure()
     
     for metric in metrics_to_plot:
-        if metric in comparison.columns:
+        if metric in _comparison.columns:
             fig.add_trace(go.Bar(
                 name=metric.upper().replace('_', ' '),
-                x=comparison['model_name'],
-                y=comparison[metric],
-                text=comparison[metric].round(3),
+                x=_comparison['model_name'],
+                y=_comparison[metric],
+                text=_comparison[metric].round(3),
                 texttemplate='%{text}',
                 textposition='outside'
             ))
@@ -690,17 +820,10 @@ def create_model_comparison_chart():
     
     return fig
 
-def create_feature_importance_chart(model_name='xgboost', top_n=15):
+@st.cache_data(ttl=600, show_spinner=False)
+def create_feature_importance_chart(_importance_df, model_name, artifacts_version, top_n=15):
     """Create feature importance chart from SHAP values."""
-    if not ML_AVAILABLE:
-        return None
-    
-    importance_df = load_feature_importance(model_name)
-    if importance_df is None:
-        st.warning(f"Feature importance not found for {model_name}")
-        return None
-    
-    importance_df = importance_df.head(top_n).sort_values('importance', ascending=True)
+    importance_df = _importance_df.head(top_n).sort_values('importance', ascending=True)
     
     fig = go.Figure(go.Bar(
         x=importance_df['importance'],
@@ -733,7 +856,32 @@ def create_feature_importance_chart(model_name='xgboost', top_n=15):
     
     return fig
 
-def display_ml_predictions_section(df):
+@fragment
+def display_feature_importance():
+    """Feature importance tab; switching models reruns only this section where fragments are supported."""
+    st.markdown("#### Feature Importance Analysis")
+    st.markdown("*Based on SHAP (SHapley Additive exPlanations) values showing which features drive churn predictions*")
+    
+    model_selector = st.selectbox(
+        "Select Model for Feature Importance",
+        ['xgboost', 'random_forest', 'logistic_regression'],
+        format_func=lambda x: x.replace('_', ' ').title()
+    )
+    
+    importance_df = load_feature_importance(model_selector)
+    if importance_df is None:
+        st.warning(f"Feature importance not found for {model_selector}")
+        return
+    
+    fig = create_feature_importance_chart(importance_df, model_selector, _artifacts_version(), top_n=15)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("#### Top 10 Features Explanation")
+    top_10 = importance_df.head(10)
+    for rank, (feature, importance) in enumerate(zip(top_10['feature'], top_10['importance']), 1):
+        st.markdown(f"**{rank}. {feature}**: Impact score {importance:.4f}")
+
+def display_ml_predictions_section():
     """Display ML predictions and explanations section."""
     st.markdown("---")
     st.subheader("Machine Learning Predictions")
@@ -810,32 +958,12 @@ def display_ml_predictions_section(df):
             """)
     
     with model_tabs[1]:
-        st.markdown("#### Feature Importance Analysis")
-        st.markdown("*Based on SHAP (SHapley Additive exPlanations) values showing which features drive churn predictions*")
-        
-        model_selector = st.selectbox(
-            "Select Model for Feature Importance",
-            ['xgboost', 'random_forest', 'logistic_regression'],
-            format_func=lambda x: x.replace('_', ' ').title()
-        )
-        
-        fig = create_feature_importance_chart(model_selector, top_n=15)
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-            
-            importance_df = load_feature_importance(model_selector)
-            if importance_df is not None:
-                st.markdown("#### Top 10 Features Explanation")
-                top_10 = importance_df.head(10)
-                for idx, row in top_10.iterrows():
-                    st.markdown(f"**{idx+1}. {row['feature']}**: Impact score {row['importance']:.4f}")
+        display_feature_importance()
     
     with model_tabs[2]:
         st.markdown("#### Model Comparison")
         
-        fig = create_model_comparison_chart()
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(create_model_comparison_chart(comparison, _artifacts_version()), use_container_width=True)
         
         if comparison is not None:
             st.markdown("#### Detailed Comparison")
@@ -885,82 +1013,76 @@ schema = "ANALYTICS"
         return
     
     try:
-        df = load_data(conn)
+        data_version = load_data_version(conn)
+        all_kpis = load_kpis(conn, ALL_FILTERS, data_version)
         
-        if df.empty:
+        if int(all_kpis['total_customers']) == 0:
             st.markdown("### No Data Available")
             st.markdown("Run dbt models to generate data: `cd churn_project && dbt run`")
             return
         
-        segments = ['All'] + sorted(df['segment'].unique().tolist())
+        dimensions = load_dimensions(conn, data_version)
+        
+        segments = ['All'] + dimensions['segment']
         selected_segment = st.sidebar.selectbox("Customer Segment", segments)
         
-        contract_types = ['All'] + sorted(df['contract_type'].unique().tolist())
+        contract_types = ['All'] + dimensions['contract_type']
         selected_contract = st.sidebar.selectbox("Contract Type", contract_types)
         
-        age_groups = ['All'] + sorted(df['age_group'].unique().tolist())
+        age_groups = ['All'] + dimensions['age_group']
         selected_age_group = st.sidebar.selectbox("Age Group", age_groups)
         
         churn_status = st.sidebar.radio("Churn Status", ['All', 'Active Only', 'Churned Only'])
+        filters = (selected_segment, selected_contract, selected_age_group, churn_status)
         
-        filtered_df = df.copy()
-        
-        if selected_segment != 'All':
-            filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-        
-        if selected_contract != 'All':
-            filtered_df = filtered_df[filtered_df['contract_type'] == selected_contract]
+        # Every figure on the page is computed in Snowflake from the same filter clause, so the
+        # sidebar count, KPIs, charts and table always describe the same customers
+        kpis = load_kpis(conn, filters, data_version)
         
-        if selected_age_group != 'All':
-            filtered_df = filtered_df[filtered_df['age_group'] == selected_age_group]
-        
-        if churn_status == 'Active Only':
-            filtered_df = filtered_df[filtered_df['churn_flag'] == 0]
-        elif churn_status == 'Churned Only':
-            filtered_df = filtered_df[filtered_df['churn_flag'] == 1]
-        
-        st.sidebar.markdown(f"**Showing {len(filtered_df):,} of {len(df):,} customers**")
+        st.sidebar.markdown(f"**Showing {int(kpis['total_customers']):,} of {int(all_kpis['total_customers']):,} customers**")
         
         st.markdown("---")
         st.subheader("Performance Overview")
-        create_kpi_cards(filtered_df)
+        create_kpi_cards(kpis)
         
         st.markdown("---")
         
+        cohort_data, contract_data, segment_data = load_chart_aggregates(conn, filters, data_version)
+        
         col1, col2 = st.columns(2)
         
         with col1:
-            st.plotly_chart(create_cohort_chart(filtered_df), use_container_width=True)
+            st.plotly_chart(create_cohort_chart(cohort_data), use_container_width=True)
         
         with col2:
-            st.plotly_chart(create_churn_by_contract(filtered_df), use_container_width=True)
+            st.plotly_chart(create_churn_by_contract(contract_data), use_container_width=True)
         
         st.markdown("---")
         
         col3, col4 = st.columns(2)
         
         with col3:
-            st.plotly_chart(create_rfm_scatter(filtered_df), use_container_width=True)
+            st.plotly_chart(create_rfm_scatter(sample_rfm_points(conn, filters, data_version)), use_container_width=True)
         
         with col4:
-            st.plotly_chart(create_segment_distribution(filtered_df), use_container_width=True)
+            st.plotly_chart(create_segment_distribution(segment_data), use_container_width=True)
         
         st.markdown("---")
         st.subheader("At-Risk Customer Portfolio")
         
-        at_risk_count = len(filtered_df[filtered_df['churn_risk_score'] >= 65])
+        at_risk_count = int(kpis['at_risk_customers'])
         st.markdown(f"*{at_risk_count:,} customers identified as high-risk and requiring immediate intervention*")
         
-        display_at_risk_table(filtered_df)
+        display_at_risk_table(conn, filters, data_version)
         
-        display_ml_predictions_section(filtered_df)
+        display_ml_predictions_section()
         
         st.markdown("---")
         st.subheader("Financial Impact Analysis")
         
-        potential_revenue_loss = filtered_df[filtered_df['churn_flag'] == 1]['estimated_lifetime_value'].sum()
-        at_risk_revenue = filtered_df[filtered_df['churn_risk_score'] >= 65]['estimated_lifetime_value'].sum()
-        total_ltv = filtered_df['estimated_lifetime_value'].sum()
+        potential_revenue_loss = kpis['churned_ltv']
+        at_risk_revenue = kpis['at_risk_ltv']
+        total_ltv = kpis['total_ltv']
         
         impact_col1, impact_col2, impact_col3 = st.columns(3)
         
@@ -968,14 +1090,14 @@ schema = "ANALYTICS"
             st.metric(
                 "Total Lifetime Value",
                 f"${total_ltv:,.0f}",
-                delta=f"{len(filtered_df):,} customers"
+                delta=f"{int(kpis['total_customers']):,} customers"
             )
         
         with impact_col2:
             st.metric(
                 "Revenue at Risk",
                 f"${at_risk_revenue:,.0f}",
-                delta=f"{(at_risk_revenue/total_ltv*100):.1f}% of total",
+                delta=f"{(at_risk_revenue / total_ltv * 100) if total_ltv > 0 else 0:.1f}% of total",
                 delta_color="inverse"
             )
         
@@ -983,7 +1105,7 @@ schema = "ANALYTICS"
             st.metric(
                 "Lost to Churn",
                 f"${potential_revenue_loss:,.0f}",
-                delta=f"{(potential_revenue_loss/total_ltv*100):.1f}% of total",
+                delta=f"{(potential_revenue_loss / total_ltv * 100) if total_ltv > 0 else 0:.1f}% of total",
                 delta_color="inverse"
             )
         
@@ -997,10 +1119,6 @@ schema = "ANALYTICS"
         2. Verify table: `dbt run --select churn_features`
         3. Check Snowflake connection settings
         """)
-    
-    finally:
-        if conn:
-            conn.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,58 @@
+"""
+Reproducibility tests for data_generation/generate_synthetic_data.py
+Seeded runs of the sharded transaction and event generators must give identical frames.
+"""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data_generation'))
+
+import generate_synthetic_data as gen
+
+NUM_CUSTOMERS = 3000  # more than one STREAM_CHUNK_CUSTOMERS block
+
+
+def spawned(func, *args):
+    """Call func in a fresh spawned process, the way main() runs the generators"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(func, *args).result()
+
+
+def build_merged(num_customers):
+    customers_df = gen.generate_customers(num_customers, gen.SEED)
+    return gen.merge_customer_subscriptions(customers_df, gen.generate_subscriptions(customers_df))
+
+
+@pytest.fixture(scope='module')
+def merged():
+    # Built out of process so Numba's thread pool never starts in the test process, where it
+    # can deadlock at exit alongside the loky workers other tests start
+    return spawned(build_merged, NUM_CUSTOMERS)
+
+
+def run_in_worker(generate, merged, seed, n_jobs):
+    return spawned(gen._run_in_worker, generate, merged, seed, n_jobs)
+
+
+@pytest.mark.parametrize('generate', [gen.generate_transactions, gen.generate_behavioral_events])
+def test_seeded_runs_are_identical(merged, generate):
+    first = run_in_worker(generate, merged, np.random.SeedSequence(gen.SEED + 1), 2)
+    second = run_in_worker(generate, merged, np.random.SeedSequence(gen.SEED + 1), 2)
+
+    pd.testing.assert_frame_equal(first, second)
+
+
+@pytest.mark.parametrize('generate', [gen.generate_transactions, gen.generate_behavioral_events])
+def test_output_does_not_depend_on_n_jobs(merged, generate):
+    serial = run_in_worker(generate, merged, gen.SEED + 1, 1)
+    parallel = run_in_worker(generate, merged, gen.SEED + 1, 2)
+
+    pd.testing.assert_frame_equal(serial, parallel)
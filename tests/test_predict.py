@@ -0,0 +1,91 @@
+"""
+Scoring regression tests for ml/predict.py
+Compares predict_churn against a plain float64 pandas / sklearn scoring of the shipped artifacts.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'ml'))
+
+import predict
+from data_prep import load_data_from_csv
+
+SAMPLE_CSV = os.path.join(ROOT_DIR, 'data_generation', 'churn_features.csv.gz')
+MODEL_NAMES = ['logistic_regression', 'random_forest', 'xgboost']
+
+
+@pytest.fixture(scope='module')
+def sample_df():
+    # Loaded the same way training reads its exports
+    return load_data_from_csv(SAMPLE_CSV)
+
+
+@pytest.fixture(scope='module')
+def preprocessors():
+    return predict.load_preprocessors()
+
+
+def baseline_probabilities(df, model, encoders, scaler, feature_names):
+    """Reference scoring: float64 features through scaler.transform and model.predict_proba"""
+    X = pd.DataFrame(index=df.index)
+    for col in feature_names:
+        if col not in df.columns:
+            X[col] = 0.0
+        elif col in encoders:
+            labels = df[col].astype(object).where(df[col].notna(), 'MISSING').astype(str)
+            X[col] = labels.map(lambda label: encoders[col].get(label, 0)).astype(np.float64)
+        else:
+            X[col] = df[col].astype(np.float64).fillna(df[col].median())
+
+    X_scaled = pd.DataFrame(scaler.transform(X), columns=feature_names, index=X.index)
+    return model.predict_proba(X_scaled)[:, 1]
+
+
+@pytest.mark.parametrize('model_name', MODEL_NAMES)
+def test_predict_churn_matches_float64_baseline(sample_df, preprocessors, model_name):
+    encoders, scaler, feature_names = preprocessors
+    model = predict.load_model(model_name)
+
+    predictions, probabilities = predict.predict_churn(sample_df, model, encoders, scaler, feature_names)
+    expected = baseline_probabilities(sample_df, model, encoders, scaler, feature_names)
+
+    np.testing.assert_allclose(probabilities, expected, rtol=0, atol=1e-6)
+    np.testing.assert_array_equal(predictions, (expected > 0.5).astype(np.int8))
+
+
+def test_single_customer_matches_batch(sample_df, preprocessors):
+    encoders, scaler, feature_names = preprocessors
+    model = predict.load_model('xgboost')
+    customers = sample_df.dropna().head(20)
+
+    _, batch_probabilities = predict.predict_churn(customers, model, encoders, scaler, feature_names)
+    single_probabilities = [predict.predict_single_customer(row, model)['churn_probability']
+                            for _, row in customers.iterrows()]
+
+    np.testing.assert_allclose(single_probabilities, batch_probabilities, rtol=0, atol=1e-6)
+
+
+def test_parallel_matches_serial_with_missing_values(sample_df, preprocessors):
+    encoders, scaler, feature_names = preprocessors
+    model = predict.load_model('xgboost')
+
+    # Gaps in every other row of the numeric features; sorting by one of them gives each chunk
+    # a different distribution, so per-chunk medians would not match the batch medians
+    numeric_cols = [col for col in feature_names if col in sample_df.columns and col not in encoders][:5]
+    df = sample_df.sort_values(numeric_cols[0], ignore_index=True)
+    df[numeric_cols] = df[numeric_cols].astype(np.float64)
+    df.loc[::2, numeric_cols] = np.nan
+
+    serial_predictions, serial_probabilities = predict.predict_churn(df, model, encoders, scaler, feature_names)
+    parallel_predictions, parallel_probabilities = predict.predict_churn_parallel(
+        df, model, encoders, scaler, feature_names, n_jobs=2
+    )
+
+    np.testing.assert_array_equal(parallel_probabilities, serial_probabilities)
+    np.testing.assert_array_equal(parallel_predictions, serial_predictions)